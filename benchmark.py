@@ -0,0 +1,213 @@
+# This is a benchmark of the simulation and the data generation on synthetic configs of different sizes
+# Configs are generated with calc_transitions for several station counts and transition procedures,
+# the phases of a run are timed separately and their peak memory is recorded
+# Results are saved as json and can be compared against the results of an earlier benchmark (the baseline)
+# with the same engine mode, export format and simulation duration,
+# phases that got slower than the regression threshold allows are reported and fail the benchmark
+#
+# usage: python benchmark.py [--output FILE] [--baseline FILE] [--threshold T] [--stations N [N ...]]
+#                            [--duration SECONDS] [--mode MODE] [--format FORMAT] [--seed SEED]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import generate_config
+import main
+
+
+# transition procedures of the benchmark configs with their additional parameters
+# (percentage procedures are left out, their transitions can contain cycles that orders never leave)
+TRANSITION_PROCEDURES = [{"transition_procedure": "UNIFORM_UPPER_TRIANGLE"},
+                         {"transition_procedure": "RANDOM_UPPER_TRIANGLE"},
+                         {"transition_procedure": "RANDOM_CORRIDOR", "corridor_width_left": -1, "corridor_width_right": 2}]
+
+STATION_COUNTS = [5, 20, 80, 500]
+
+
+def benchmark_configs(station_counts, sim_duration, seed):
+    # synthetic configs by name, the random transition procedures draw from numpy's global generator
+    np.random.seed(seed)
+    configs = {}
+    for n_stations in station_counts:
+        for procedure_params in TRANSITION_PROCEDURES:
+            transitions, transition_procedure = generate_config.calc_transitions(dict(procedure_params, n_stations=n_stations))
+            configs[str(n_stations) + "_stations_" + transition_procedure] = {"STATION_COUNT": n_stations,
+                                                                                "STATION_PROBS": transitions,
+                                                                                "SHUFFLE_STATIONS": False,
+                                                                                "MAINTENANCE_INTERVAL": 3600,
+                                                                                "SIM_DURATION": sim_duration,
+                                                                                "ORDER_FREQUENCY": 0.00166667,
+                                                                                "ORDER_PRIORITIES": 5,
+                                                                                "SEED": seed}
+    return configs
+
+
+def reset_peak_rss():
+    # reset the peak resident set size of this process (linux only)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    return
+
+
+def peak_rss_mb():
+    # peak resident set size since the last reset, read from /proc since the local resource module
+    # shadows the resource module of the standard library (linux only)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def measure(results, phase, function, *args, **kwargs):
+    # run a phase and record its runtime and peak memory
+    reset_peak_rss()
+    start_time = time.perf_counter()
+    result = function(*args, **kwargs)
+    results[phase] = {"seconds": time.perf_counter() - start_time, "peak_rss_mb": peak_rss_mb()}
+    return result
+
+
+def run_case(params, mode="tick", output_format="csv"):
+    # all phases of one config, outputs are written to a temporary directory
+    params = main.set_default_params(dict(params, SIM_MODE=mode, OUTPUT_FORMAT=output_format))
+    results = {}
+
+    sim_enterprise = measure(results, "build_enterprise", main.build_enterprise, params)
+    measure(results, "simulate", main.simulate, sim_enterprise, mode=mode)
+    results["simulate"]["steps_per_second"] = params["SIM_DURATION"] / results["simulate"]["seconds"]
+
+    event_log = measure(results, "generate_event_log", main.generate_event_log, sim_enterprise)
+    relevant_indices = measure(results, "generate_event_times", main.generate_event_times, event_log, params["SIM_DURATION"])
+    enterprise_log = measure(results, "generate_enterprise_log", main.generate_enterprise_log, sim_enterprise, relevant_indices)
+    station_frame, resource_frame = measure(results, "generate_parameter_frame", main.generate_parameter_frame, sim_enterprise)
+
+    with tempfile.TemporaryDirectory() as export_path:
+        extension = main.EXPORT_EXTENSIONS[output_format]
+        measure(results, "export_event_log", main.export_event_log,
+                event_log, os.path.join(export_path, "event_log" + extension), output_format)
+        measure(results, "export_enterprise_log", main.export_enterprise_log,
+                enterprise_log, os.path.join(export_path, "enterprise_log" + extension), output_format)
+        measure(results, "export_parameter_frames", main.export_parameter_frames,
+                station_frame, resource_frame, os.path.join(export_path, "stations" + extension),
+                os.path.join(export_path, "resources" + extension), output_format)
+
+    results["size"] = {"events": len(event_log), "enterprise_log_rows": len(enterprise_log)}
+    return results
+
+
+def run_benchmark(station_counts=STATION_COUNTS, sim_duration=60*60*24, mode="tick", output_format="csv", seed=0):
+
+    configs = benchmark_configs(station_counts, sim_duration, seed)
+    benchmark = {"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                          "python": platform.python_version(),
+                          "numpy": np.__version__,
+                          "pandas": pd.__version__,
+                          "platform": platform.platform(),
+                          "sim_duration": sim_duration,
+                          "mode": mode,
+                          "output_format": output_format,
+                          "seed": seed},
+                 "cases": {}}
+
+    for case_name, params in configs.items():
+        print("Benchmarking " + case_name + "...")
+        # every case runs in a fresh process so that memory of earlier cases does not distort its peak
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            benchmark["cases"][case_name] = executor.submit(run_case, params, mode, output_format).result()
+        print("...done! " + str(round(benchmark["cases"][case_name]["simulate"]["steps_per_second"])) + " steps/s")
+
+    return benchmark
+
+
+# settings of a benchmark that its results depend on, runs can only be compared if they agree on all of them
+COMPARED_SETTINGS = ["mode", "output_format", "sim_duration"]
+
+
+def mismatched_settings(benchmark, baseline):
+    # settings in which the benchmark differs from the baseline (or that are missing in one of them)
+    return [setting for setting in COMPARED_SETTINGS
+            if benchmark["meta"].get(setting) is None or benchmark["meta"].get(setting) != baseline["meta"].get(setting)]
+
+
+def compare_benchmarks(benchmark, baseline, threshold=0.1, min_seconds=0.05):
+    # relative runtime of every phase against the baseline, phases faster than min_seconds in both runs are noise
+    # e.g. a tick run compared to an event run or a csv export compared to a parquet export is no regression
+    mismatches = mismatched_settings(benchmark, baseline)
+    if len(mismatches) > 0:
+        raise ValueError("benchmark and baseline differ in their settings: " +
+                         ", ".join(setting + " " + str(benchmark["meta"].get(setting)) + " vs. " +
+                                   str(baseline["meta"].get(setting)) for setting in mismatches))
+
+    comparison = []
+    for case_name, case_results in benchmark["cases"].items():
+        if case_name not in baseline["cases"]:
+            continue
+        for phase, phase_results in case_results.items():
+            baseline_results = baseline["cases"][case_name].get(phase)
+            if "seconds" not in phase_results or baseline_results is None:
+                continue
+            if max(phase_results["seconds"], baseline_results["seconds"]) < min_seconds:
+                continue
+            ratio = phase_results["seconds"] / baseline_results["seconds"]
+            comparison.append({"case": case_name,
+                               "phase": phase,
+                               "baseline_seconds": baseline_results["seconds"],
+                               "seconds": phase_results["seconds"],
+                               "ratio": ratio,
+                               "regression": ratio > 1 + threshold})
+    return pd.DataFrame(comparison, columns=["case", "phase", "baseline_seconds", "seconds", "ratio", "regression"])
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Benchmark simulation, log generation and export")
+    parser.add_argument("--output", default=os.path.join("export", "benchmark.json"),
+                        help="file the results are written to")
+    parser.add_argument("--baseline", default=None, help="results of an earlier benchmark to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative slowdown against the baseline")
+    parser.add_argument("--stations", type=int, nargs="+", default=STATION_COUNTS, help="station counts of the configs")
+    parser.add_argument("--duration", type=int, default=60*60*24, help="simulated seconds per config")
+    parser.add_argument("--mode", default="tick", help="simulation engine, i.e. tick or event")
+    parser.add_argument("--format", default="csv", help="export format, i.e. csv, parquet or arrow")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the configs and the simulations")
+    args = parser.parse_args()
+
+    benchmark = run_benchmark(args.stations, args.duration, args.mode, args.format, args.seed)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(benchmark, f, indent=2)
+    print("Results written to " + args.output)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        try:
+            comparison = compare_benchmarks(benchmark, baseline, args.threshold)
+        except ValueError as error:
+            print("Cannot compare against the baseline: " + str(error))
+            sys.exit(2)
+        print(comparison.to_string(index=False))
+
+        regressions = comparison[comparison["regression"]]
+        if len(regressions) > 0:
+            print(str(len(regressions)) + " phases are more than " + str(round(args.threshold * 100)) + "% slower than the baseline")
+            sys.exit(1)
+        print("No regressions against the baseline")
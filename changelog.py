@@ -0,0 +1,110 @@
+# This class records a value over simulation time as a change point log
+# Only the times at which the value changes are stored, so memory scales with the number of events
+# instead of the simulation duration; the value at any time is looked up from the last change before it
+# Change times and values are compact arrays, under a memory budget they become chunked series,
+# so long logs can be spilled to disk
+
+from array import array
+
+import numpy as np
+
+from chunkedseries import ChunkedSeries, CHUNK_SIZE, series_values, series_take, series_search_sorted
+
+
+class ChangeLog:
+
+    def __init__(self, log_name, dtype=np.int64):
+
+        self.logName = log_name
+        self.dtype = np.dtype(dtype)
+
+        self.changeTimes = array('q')  # simulation times at which the value changed
+        self.changeValues = array('q')  # values from the respective change time on
+        self.endTime = 0  # the log covers all simulation times before endTime
+
+    def attachBudget(self, memory_budget, log_name):
+        # change times and values are spilled under the memory budget from now on
+        self.changeTimes = ChunkedSeries("changeTimes", memory_budget, log_name + "_times", values=self.changeTimes)
+        self.changeValues = ChunkedSeries("changeValues", memory_budget, log_name + "_values", values=self.changeValues)
+        return
+
+    def record(self, sim_time, value):
+        # record the value at sim_time, only stored if it differs from the current value
+        # (a value recorded again at the same time replaces the one before, e.g. a station taken and freed again)
+        if len(self.changeTimes) > 0 and self.changeTimes[-1] == sim_time:
+            self.changeTimes.pop()
+            self.changeValues.pop()
+        if len(self.changeValues) == 0 or self.changeValues[-1] != value:
+            self.changeTimes.append(sim_time)
+            self.changeValues.append(value)
+        self.endTime = sim_time + 1
+        return
+
+    def extend(self, n_steps):
+        # the current value stays the same for the next n_steps iterations
+        self.endTime += n_steps
+        return
+
+    def extendTo(self, end_time):
+        # the current value stays the same up to end_time
+        self.endTime = max(self.endTime, end_time)
+        return
+
+    def valueAt(self, sim_time):
+        if sim_time < 0 or sim_time >= self.endTime:
+            raise IndexError("simulation time " + str(sim_time) + " is not covered by log " + str(self.logName))
+        value = self.changeValues[int(series_search_sorted(self.changeTimes, sim_time, side='right')) - 1]
+        return self.dtype.type(value).item()
+
+    def valuesAt(self, sim_times):
+        # values at a vector of simulation times
+        sim_times = np.asarray(sim_times, dtype=np.int64)
+        if len(sim_times) > 0 and (sim_times.min() < 0 or sim_times.max() >= self.endTime):
+            raise IndexError("simulation times are not covered by log " + str(self.logName))
+        # only the chunks of the changes that are looked up are read
+        last_changes = series_search_sorted(self.changeTimes, sim_times, side='right') - 1
+        return series_take(self.changeValues, last_changes).astype(self.dtype)
+
+    def timeAverage(self, start_time=0, end_time=None):
+        # mean value over the simulation times from start_time to end_time, weighted by how long each value held
+        end_time = self.endTime if end_time is None else min(end_time, self.endTime)
+        if end_time <= start_time:
+            raise IndexError("no simulation time between " + str(start_time) + " and " + str(end_time) +
+                             " is covered by log " + str(self.logName))
+        # only the changes from the last one before the window up to its end are relevant
+        first_change = max(int(series_search_sorted(self.changeTimes, start_time, side='right')) - 1, 0)
+        last_change = int(series_search_sorted(self.changeTimes, end_time, side='left'))
+        change_times = series_values(self.changeTimes, first_change, last_change)
+        change_values = series_values(self.changeValues, first_change, last_change)
+        # every value holds from its change time until the next change, clipped to the averaging window
+        hold_starts = np.clip(change_times, start_time, end_time)
+        hold_ends = np.clip(np.append(change_times[1:], end_time), start_time, end_time)
+        return float(np.dot(change_values, hold_ends - hold_starts)) / (end_time - start_time)
+
+    def periodAverages(self, period_length):
+        # time-weighted mean value of every period of period_length simulation times (the last one may be shorter)
+        change_times = series_values(self.changeTimes)
+        change_values = series_values(self.changeValues)
+        if self.endTime == 0:
+            return np.zeros(0)
+        period_bounds = np.append(np.arange(0, self.endTime, period_length), self.endTime)
+
+        # integral of the value from time 0 up to every change time and from there up to the period bounds
+        change_integrals = np.concatenate(([0], np.cumsum(change_values[:-1] * np.diff(change_times))))
+        last_changes = np.searchsorted(change_times, period_bounds, side='right') - 1
+        bound_integrals = change_integrals[last_changes] + \
+            change_values[last_changes] * (period_bounds - change_times[last_changes])
+        return np.diff(bound_integrals) / np.diff(period_bounds)
+
+    def maxValue(self, default=0):
+        # largest value of the log, read chunk by chunk
+        if len(self.changeValues) == 0:
+            return default
+        return max(series_values(self.changeValues, start, start + CHUNK_SIZE).max().item()
+                   for start in range(0, len(self.changeValues), CHUNK_SIZE))
+
+    def __len__(self):
+        return self.endTime
+
+    def __getitem__(self, sim_time):
+        return self.valueAt(sim_time)
@@ -0,0 +1,251 @@
+# This class stores a growing series of numbers, e.g. the values of a log over simulation time, under a memory budget
+# Logs only become chunked series once a memory budget is attached, without a budget they stay plain lists and arrays
+# Values are appended to a compact buffer that is sealed into a fixed-size chunk whenever it is full
+# The buffer reserves its memory in the budget block by block, if the budget is exceeded the buffer is spilled
+# to a memory-mapped file of the series (every value at the offset of its position) and the chunk is sealed on disk,
+# so beyond the budget a series holds at most one block of values in memory
+# Spilled values are only read back when they are accessed
+
+import os
+from array import array
+
+import numpy as np
+
+CHUNK_SIZE = 2**16  # values per chunk
+BUFFER_BLOCK = 2**6  # values per reservation of the buffer in the memory budget (CHUNK_SIZE is a multiple of it)
+TYPECODES = {np.dtype(np.int64): "q", np.dtype(np.float64): "d"}  # typecodes of the buffers per value type
+
+
+def series_values(series, start=0, stop=None):
+    # values of a chunked series or a plain list or array from start to stop as one numpy array
+    if isinstance(series, ChunkedSeries):
+        return series.values(start, stop)
+    return np.asarray(series)[start:stop]
+
+
+def series_take(series, positions):
+    # values of a chunked series or a plain list or array at a vector of positions
+    if isinstance(series, ChunkedSeries):
+        return series.take(positions)
+    return np.asarray(series)[positions]
+
+
+def series_search_sorted(series, values, side="left"):
+    # insertion positions of values into a sorted chunked series or plain list or array
+    if isinstance(series, ChunkedSeries):
+        return series.searchSorted(values, side=side)
+    return np.searchsorted(np.asarray(series), values, side=side)
+
+
+class ChunkedSeries:
+
+    def __init__(self, series_name, memory_budget, spill_name, dtype=np.int64, values=()):
+
+        self.seriesName = series_name
+        self.dtype = np.dtype(dtype)
+        self.memoryBudget = memory_budget
+        self.spillFile = os.path.join(memory_budget.spillDir, spill_name + "." + self.dtype.name + ".bin")
+
+        self.chunks = []  # sealed chunks, an array if the chunk is in memory or None if it is spilled
+        self.chunkFirsts = []  # first value of every sealed chunk, to search sorted series without reading chunks
+        self.buffer = array(TYPECODES[self.dtype])  # values of the open chunk that are kept in memory
+        self.bufferStart = 0  # position of the first buffered value, values of the open chunk before it are spilled
+        self.bufferCapacity = 0  # length of the buffer up to which its memory is reserved (or one block if spilling)
+        self.reservedBytes = 0  # bytes reserved for the buffer in the memory budget
+
+        memory_budget.register(self, spill_name)
+        self.extend(values)
+
+    def append(self, value):
+        if len(self.buffer) == self.bufferCapacity:
+            self.growBuffer()
+        self.buffer.append(value)
+
+    def extend(self, values):
+        # append a list (or array) of values, filling the buffer in slices
+        if isinstance(values, np.ndarray):
+            values = array(self.buffer.typecode, values.astype(self.dtype).tobytes())
+        elif not isinstance(values, array):
+            values = array(self.buffer.typecode, values)
+        position = 0
+        while position < len(values):
+            if len(self.buffer) == self.bufferCapacity:
+                self.growBuffer()
+            taken = min(self.bufferCapacity - len(self.buffer), len(values) - position)
+            self.buffer.extend(values[position:position + taken])
+            position += taken
+        return
+
+    def growBuffer(self):
+        # seal the open chunk if it is full and make room for the next block of values in the buffer,
+        # the block is kept in memory if it fits into the budget, otherwise the buffer is spilled first
+        if self.openLength() == CHUNK_SIZE:
+            self.seal()
+        block_bytes = BUFFER_BLOCK * self.dtype.itemsize
+        if self.memoryBudget.reserve(block_bytes) is True:
+            self.reservedBytes += block_bytes
+        else:
+            self.spillBuffer()
+        self.bufferCapacity = len(self.buffer) + min(BUFFER_BLOCK, CHUNK_SIZE - self.openLength())
+        return
+
+    def spillBuffer(self):
+        # write the buffered values to the spill file and release their memory
+        if len(self.buffer) > 0:
+            self.writeSpilled(self.bufferStart, self.buffer)
+            self.bufferStart += len(self.buffer)
+            self.buffer = array(self.buffer.typecode)
+        self.memoryBudget.release(self.reservedBytes)
+        self.reservedBytes = 0
+        return
+
+    def seal(self):
+        # turn the full open chunk into a sealed chunk,
+        # it stays in memory if none of its values were spilled and the memory of all of them is reserved
+        sealed_length = len(self.chunks) * CHUNK_SIZE
+        if self.bufferStart == sealed_length and self.reservedBytes >= CHUNK_SIZE * self.dtype.itemsize:
+            # the reservation of the buffer is taken over by the chunk
+            chunk = np.frombuffer(self.buffer, dtype=self.dtype).copy()
+            self.chunks.append(chunk)
+            self.chunkFirsts.append(chunk[0].item())
+            self.memoryBudget.release(self.reservedBytes - chunk.nbytes)
+            self.reservedBytes = 0
+        else:
+            self.spillBuffer()
+            self.chunks.append(None)
+            self.chunkFirsts.append(self.readSpilled(sealed_length, 1)[0].item())
+        self.buffer = array(self.buffer.typecode)
+        self.bufferStart = len(self.chunks) * CHUNK_SIZE
+        self.bufferCapacity = 0
+        return
+
+    def unseal(self):
+        # turn the last sealed chunk back into the open chunk, e.g. to pop its last value
+        # (values of a spilled chunk stay in the spill file as the spilled part of the open chunk,
+        # the values and the reservation of a chunk in memory are taken over by the buffer)
+        chunk = self.chunks.pop()
+        self.chunkFirsts.pop()
+        if chunk is not None:
+            self.bufferStart -= CHUNK_SIZE
+            self.buffer = array(self.buffer.typecode, chunk.tobytes())
+            self.reservedBytes += chunk.nbytes
+        self.bufferCapacity = len(self.buffer)
+        return
+
+    def pop(self):
+        # remove and return the last value
+        if len(self.buffer) == 0:
+            if len(self) == 0:
+                raise IndexError("pop from empty series " + str(self.seriesName))
+            if self.openLength() == 0:
+                self.unseal()
+            if len(self.buffer) == 0:
+                # the last value is spilled, the buffer goes on from its position
+                self.bufferStart -= 1
+                return self.readSpilled(self.bufferStart, 1)[0].item()
+        return self.buffer.pop()
+
+    def last(self):
+        # the last value (usually still in the buffer) or None if the series is empty
+        if len(self.buffer) > 0:
+            return self.buffer[-1]
+        if len(self) > 0:
+            return self[-1]
+        return None
+
+    def openLength(self):
+        # number of values in the open chunk, spilled or buffered
+        return self.bufferStart + len(self.buffer) - len(self.chunks) * CHUNK_SIZE
+
+    def writeSpilled(self, position, values):
+        # write values to the spill file at the offset of their position (the file is created on the first write,
+        # a series resumed from a checkpoint overwrites the values spilled after the checkpoint)
+        with open(self.spillFile, "r+b" if os.path.exists(self.spillFile) else "wb") as f:
+            f.seek(position * self.dtype.itemsize)
+            f.write(values.tobytes())
+        return
+
+    def readSpilled(self, position, n_values):
+        return np.memmap(self.spillFile, dtype=self.dtype, mode="r", offset=position * self.dtype.itemsize,
+                         shape=(n_values,))
+
+    def chunk(self, index):
+        # values of a chunk, spilled chunks are mapped read-only from the spill file
+        # (the index after the sealed chunks is the open chunk)
+        if index == len(self.chunks):
+            return self.openChunk()
+        chunk = self.chunks[index]
+        if chunk is not None:
+            return chunk
+        return self.readSpilled(index * CHUNK_SIZE, CHUNK_SIZE)
+
+    def openChunk(self):
+        # values of the open chunk, its spilled part is read back from the spill file
+        buffered = np.frombuffer(self.buffer, dtype=self.dtype) if len(self.buffer) > 0 else np.zeros(0, self.dtype)
+        sealed_length = len(self.chunks) * CHUNK_SIZE
+        if self.bufferStart == sealed_length:
+            return buffered
+        return np.concatenate((self.readSpilled(sealed_length, self.bufferStart - sealed_length), buffered))
+
+    def values(self, start=0, stop=None):
+        # values from start to stop as one array, only the chunks that overlap them are read
+        stop = len(self) if stop is None else min(stop, len(self))
+        if stop <= start:
+            return np.zeros(0, dtype=self.dtype)
+        parts = []
+        for index in range(start // CHUNK_SIZE, (stop - 1) // CHUNK_SIZE + 1):
+            chunk_start = index * CHUNK_SIZE
+            parts.append(np.array(self.chunk(index)[max(start - chunk_start, 0):stop - chunk_start]))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def take(self, positions):
+        # values at a vector of positions, every chunk that holds any of them is read once
+        positions = np.asarray(positions, dtype=np.int64)
+        taken = np.empty(len(positions), dtype=self.dtype)
+        chunk_indices = positions // CHUNK_SIZE
+        for index in np.unique(chunk_indices):
+            in_chunk = chunk_indices == index
+            taken[in_chunk] = self.chunk(index)[positions[in_chunk] - index * CHUNK_SIZE]
+        return taken
+
+    def searchSorted(self, values, side="left"):
+        # insertion positions of values into a sorted series (like np.searchsorted),
+        # the chunk of every value is found from the first values of the chunks, so only those chunks are read
+        values = np.asarray(values)
+        open_firsts = [self[len(self.chunks) * CHUNK_SIZE]] if self.openLength() > 0 else []
+        firsts = np.array(self.chunkFirsts + open_firsts, dtype=self.dtype)
+        chunk_indices = np.maximum(np.searchsorted(firsts, values, side=side) - 1, 0)
+        positions = np.zeros(values.shape, dtype=np.int64)
+        for index in np.unique(chunk_indices):
+            in_chunk = chunk_indices == index
+            positions[in_chunk] = index * CHUNK_SIZE + np.searchsorted(self.chunk(index), values[in_chunk], side=side)
+        return positions
+
+    def memoryBytes(self):
+        # bytes of the chunks kept in memory and of the buffer
+        return sum(chunk.nbytes for chunk in self.chunks if chunk is not None) + \
+            self.buffer.buffer_info()[1] * self.buffer.itemsize
+
+    def diskBytes(self):
+        # bytes of the spilled chunks and of the spilled part of the open chunk
+        spilled_chunks = sum(1 for chunk in self.chunks if chunk is None)
+        return (spilled_chunks * CHUNK_SIZE + self.bufferStart - len(self.chunks) * CHUNK_SIZE) * self.dtype.itemsize
+
+    def __len__(self):
+        return self.bufferStart + len(self.buffer)
+
+    def __getitem__(self, key):
+        # single values (negative positions count from the end) or slices without step as arrays
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise IndexError("series " + str(self.seriesName) + " can only be sliced without step")
+            return self.values(start, stop)
+        position = key + len(self) if key < 0 else key
+        if position < 0 or position >= len(self):
+            raise IndexError("position " + str(key) + " is not in series " + str(self.seriesName))
+        if position >= self.bufferStart:
+            return self.buffer[position - self.bufferStart]
+        if position >= len(self.chunks) * CHUNK_SIZE:
+            return self.readSpilled(position, 1)[0].item()
+        return self.chunk(position // CHUNK_SIZE)[position % CHUNK_SIZE].item()
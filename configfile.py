@@ -0,0 +1,85 @@
+# This module reads and writes simulation configs
+# Configs are either json files with the transition probabilities as nested lists or binary npz files that keep
+# the scalar parameters as json next to the transitions in compressed sparse row form (see TransitionMatrix)
+# Either way STATION_PROBS is loaded as a TransitionMatrix, its alias tables for route sampling are cached by the
+# content hash of the transitions in a cache directory next to the configs, so they are built once per matrix
+
+import json
+import os
+
+import numpy as np
+
+from routesampler import RouteSampler
+from transitionmatrix import TransitionMatrix
+
+CONFIG_EXTENSIONS = (".json", ".npz")
+CACHE_DIR = ".cache"  # directory of the cached alias tables within the config directory
+CACHE_VERSION = 1  # cached alias tables of other versions are built again
+
+
+def config_files(config_dir):
+    # config files of a directory in a fixed order, i.e. without the cache directory or other files
+    return sorted(config_file for config_file in os.listdir(config_dir)
+                  if os.path.splitext(config_file)[1] in CONFIG_EXTENSIONS)
+
+
+def save_config(params, filename):
+    # write a config as npz, STATION_PROBS may be nested lists, an array or a TransitionMatrix
+    station_probs = params["STATION_PROBS"]
+    if not isinstance(station_probs, TransitionMatrix):
+        station_probs = TransitionMatrix.fromDense("TransitionMatrix", station_probs)
+    scalar_params = {key: value for key, value in params.items() if key != "STATION_PROBS"}
+
+    # uncompressed, the arrays are read without decompressing them
+    with open(filename, "wb") as f:
+        np.savez(f,
+                 params=np.array(json.dumps(scalar_params)),
+                 row_pointers=station_probs.rowPointers,
+                 targets=station_probs.targets,
+                 probabilities=station_probs.probabilities,
+                 content_hash=np.array(station_probs.contentHash))
+    return filename
+
+
+def load_config(filename, cache=True):
+    # read a json or npz config, STATION_PROBS is a TransitionMatrix with its alias tables
+    if os.path.splitext(filename)[1] == ".npz":
+        with np.load(filename) as config:
+            params = json.loads(config["params"].item())
+            params["STATION_PROBS"] = TransitionMatrix("TransitionMatrix", config["row_pointers"], config["targets"],
+                                                       config["probabilities"])
+            if params["STATION_PROBS"].contentHash != config["content_hash"].item():
+                raise ValueError("transitions of config " + str(filename) + " do not match its content hash")
+    else:
+        with open(filename) as f:
+            params = json.load(f)
+        params["STATION_PROBS"] = TransitionMatrix.fromDense("TransitionMatrix", params["STATION_PROBS"])
+
+    if cache is True:
+        prepare_transitions(params["STATION_PROBS"], os.path.join(os.path.dirname(filename), CACHE_DIR))
+    return params
+
+
+def prepare_transitions(station_probs, cache_dir):
+    # read the alias tables of the transitions from the cache or build and cache them
+    cache_filename = os.path.join(cache_dir, "alias_tables_" + station_probs.contentHash + ".npz")
+    if os.path.exists(cache_filename):
+        with np.load(cache_filename) as alias_tables:
+            if alias_tables["version"].item() == CACHE_VERSION:
+                station_probs.aliasTables = {table: alias_tables[table]
+                                             for table in ("widths", "outcomes", "thresholds", "aliases")}
+                return station_probs
+
+    station_probs.aliasTables = RouteSampler.buildAliasTables(station_probs)
+
+    # written to a temporary file first, so parallel runs of the same config never read half a cache file,
+    # the cache is optional, e.g. for configs in read-only directories
+    temporary_filename = cache_filename + "." + str(os.getpid()) + ".tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temporary_filename, "wb") as f:
+            np.savez(f, version=np.array(CACHE_VERSION), **station_probs.aliasTables)
+        os.replace(temporary_filename, cache_filename)
+    except OSError:
+        pass
+    return station_probs
@@ -0,0 +1,170 @@
+# This class models the performance degradation of stations due to usage and their maintenance
+# Stations lose a uniformly distributed share of their performance in every iteration they are working
+# and are reset to full performance whenever the maintenance interval is reached
+#
+# Modes
+# - "sampled": degradation is drawn in every working iteration and the performance of every station is logged
+#              in every iteration, mean performances are averaged over that log (original behaviour)
+# - "expected": performance is tracked as piecewise linear segments between maintenance resets, degrading
+#               with the expected degradation per iteration, mean performances are calculated in closed form
+# - "stochastic": like "expected" but the summed degradation of each segment is drawn from its aggregate
+#                 distribution (exactly for short segments, by its normal approximation for longer ones)
+
+import numpy as np
+
+
+class DegradationModel:
+
+    def __init__(self, model_name, mode, maintenance_interval, max_degradation_per_period, random_streams):
+
+        if mode not in ("sampled", "expected", "stochastic"):
+            raise ValueError("unknown degradation mode: " + str(mode))
+
+        self.modelName = model_name
+        self.mode = mode
+        self.maintenanceInterval = maintenance_interval
+        self.maxDegradationPerPeriod = max_degradation_per_period
+        self.randomStreams = random_streams
+
+        self.exactSegmentLength = 32  # segments up to this length are drawn per iteration in stochastic mode
+
+    def recordPerformances(self, stations):
+        # record station performance each iteration
+        if self.mode == "sampled":
+            for station in stations:
+                station.performanceLog.append(station.performance)
+        return
+
+    def startWork(self, station, sim_time):
+        # returns the performance of the station when it starts working on an order
+        if self.mode != "sampled":
+            self.advance(station, sim_time)
+            station.working = True
+            station.workStartIntegral = station.performanceIntegral
+        return station.performance
+
+    def degrade(self, station):
+        # adjust station performance due to station usage - check if station has below zero performance
+        if self.mode == "sampled":
+            station.performance -= self.randomStreams.uniform("degradation") * self.maxDegradationPerPeriod
+            if station.performance < 0:
+                station.performance = 0
+        return
+
+    def finishWork(self, station, work_start, work_end):
+        # returns the mean performance of the station while working on an order
+        if self.mode == "sampled":
+            return sum(station.performanceLog[work_start:work_end]) / (work_end - work_start)
+
+        self.advance(station, work_end)
+        if work_end == work_start:
+            mean_performance = station.performance
+        else:
+            mean_performance = (station.performanceIntegral - station.workStartIntegral) / (work_end - work_start)
+
+        # the station is still degrading in the iteration it finishes the order
+        self.advance(station, work_end + 1)
+        station.working = False
+        return mean_performance
+
+    def maintain(self, stations, sim_time):
+        # maintain stations when maintenance interval is reached (after all orders are worked on)
+        # closed form modes account for maintenance resets when advancing the stations
+        if self.mode == "sampled" and sim_time % self.maintenanceInterval == 0:
+            for station in stations:
+                station.performance = 1
+        return
+
+    def fastForward(self, stations, working_stations, n_steps):
+        # advance the per iteration performance log of the stations by n_steps iterations without maintenance
+        if self.mode == "sampled":
+            for station in stations:
+                if station in working_stations:
+                    degradation = np.cumsum(self.randomStreams.generator("degradation").uniform(
+                        0, self.maxDegradationPerPeriod, n_steps))
+                    performances = np.maximum(station.performance - np.concatenate(([0], degradation[:-1])), 0)
+                    station.performanceLog.extend(performances.tolist())
+                    station.performance = max(station.performance - degradation[-1], 0)
+                else:
+                    station.performanceLog.extend([station.performance] * n_steps)
+        return
+
+    def advance(self, station, sim_time):
+        # bring performance and performance integral of the station forward to the start of iteration sim_time
+        # the performance is reset after every iteration that is a multiple of the maintenance interval
+        while station.performanceTime < sim_time:
+            next_reset = -(-station.performanceTime // self.maintenanceInterval) * self.maintenanceInterval
+            if sim_time <= next_reset:
+                self.advanceSegment(station, sim_time - station.performanceTime)
+                station.performanceTime = sim_time
+                return
+
+            self.advanceSegment(station, next_reset + 1 - station.performanceTime)
+            station.performance = 1
+            station.performanceTime = next_reset + 1
+
+            # full maintenance intervals all start at full performance
+            full_intervals = (sim_time - station.performanceTime) // self.maintenanceInterval
+            if full_intervals > 0:
+                if station.working is False or self.maxDegradationPerPeriod == 0:
+                    station.performanceIntegral += full_intervals * self.maintenanceInterval
+                elif self.mode == "expected":
+                    station.performanceIntegral += full_intervals * self.segmentIntegral(1, self.maintenanceInterval)
+                else:
+                    for interval in range(0, full_intervals):
+                        self.advanceSegment(station, self.maintenanceInterval)
+                        station.performance = 1
+                station.performanceTime += full_intervals * self.maintenanceInterval
+        return
+
+    def advanceSegment(self, station, n_steps):
+        # accumulate performance of n_steps iterations without maintenance in between
+        if n_steps <= 0:
+            return
+
+        if station.working is False or self.maxDegradationPerPeriod == 0:
+            station.performanceIntegral += n_steps * station.performance
+            return
+
+        if self.mode == "expected":
+            station.performanceIntegral += self.segmentIntegral(station.performance, n_steps)
+            station.performance = max(station.performance - n_steps * self.maxDegradationPerPeriod / 2, 0)
+            return
+
+        summed_degradation, weighted_degradation = self.drawDegradation(n_steps)
+        station.performanceIntegral += max(n_steps * station.performance - weighted_degradation, 0)
+        station.performance = max(station.performance - summed_degradation, 0)
+        return
+
+    def segmentIntegral(self, start_performance, n_steps):
+        # sum of linearly degrading performances over n_steps iterations, bounded below by zero
+        rate = self.maxDegradationPerPeriod / 2
+        positive_steps = min(n_steps, int(np.ceil(start_performance / rate)))
+        return positive_steps * start_performance - rate * positive_steps * (positive_steps - 1) / 2
+
+    def drawDegradation(self, n_steps):
+        # draw the summed degradation over n_steps iterations and the degradation weighted by the number
+        # of remaining iterations it is effective in, i.e. what is lost from the performance integral
+        # n_steps uniform draws sum up to an Irwin-Hall distribution which is approximated by
+        # a bivariate normal distribution with the exact moments for longer segments
+        if n_steps <= self.exactSegmentLength:
+            degradation = self.randomStreams.generator("degradation").uniform(0, self.maxDegradationPerPeriod, n_steps)
+            weights = np.arange(n_steps - 1, -1, -1)
+            return degradation.sum(), np.dot(weights, degradation)
+
+        mean = self.maxDegradationPerPeriod / 2
+        variance = self.maxDegradationPerPeriod ** 2 / 12
+        summed_mean = n_steps * mean
+        weighted_mean = mean * n_steps * (n_steps - 1) / 2
+        summed_variance = n_steps * variance
+        weighted_variance = variance * (n_steps - 1) * n_steps * (2 * n_steps - 1) / 6
+        covariance = variance * n_steps * (n_steps - 1) / 2
+
+        # correlate two standard normal draws with the cholesky factor of the covariance matrix
+        first_normal = self.randomStreams.standardNormal("degradation")
+        second_normal = self.randomStreams.standardNormal("degradation")
+        summed_std = np.sqrt(summed_variance)
+        summed_degradation = summed_mean + summed_std * first_normal
+        weighted_degradation = weighted_mean + covariance / summed_std * first_normal + \
+            np.sqrt(max(weighted_variance - covariance ** 2 / summed_variance, 0)) * second_normal
+        return max(summed_degradation, 0), max(weighted_degradation, 0)
@@ -4,6 +4,14 @@ import station
 import resource
 import ordermanager
 import timemanager
+import eventcalendar
+import degradation
+import randomstreams
+import routesampler
+import changelog
+import chunkedseries
+import eventrecorder
+import freepool
 
 
 class Enterprise:
@@ -22,25 +30,107 @@ class Enterprise:
                  resource_productivities,
                  sim_duration,
                  order_freq,
-                 order_priorities):
+                 order_priorities,
+                 degradation_mode="expected",
+                 seed=None):
 
         print("Initializing enterprise...", end='')
 
         self.enterpriseName = enterprise_name
+        self.randomStreams = randomstreams.RandomStreams("RandomStreams", seed)
         self.stations = [station.Station(station_names[i],
                                          station_probs[i],
-                                         station_durations[i]) for i in range(0, n_stations)]
+                                         station_durations[i],
+                                         i) for i in range(0, n_stations)]
         self.stationProbs = station_probs
+        self.routeSampler = routesampler.RouteSampler("RouteSampler", station_probs, self.randomStreams)
         self.shuffleStations = shuffle_stations
         self.maintenanceInterval = maintenance_interval
         self.maxDegradationPerPeriod = max_degradation_per_period
+        self.degradationModel = degradation.DegradationModel("DegradationModel",
+                                                             degradation_mode,
+                                                             maintenance_interval,
+                                                             max_degradation_per_period,
+                                                             self.randomStreams)
         self.resources = [resource.Resource(resource_names[i],
-                                            resource_productivities[i]) for i in range(0, n_resources)]
+                                            resource_productivities[i],
+                                            i) for i in range(0, n_resources)]
         self.timeManager = timemanager.TimeManager("TimeManager", sim_duration)
         self.orderManager = ordermanager.OrderManager("OrderManager", order_freq, order_priorities)
+        self.eventCalendar = eventcalendar.EventCalendar("EventCalendar")
+        self.dispatchStations = set()  # stations that may have an order to assign in the next iteration
+        self.eventRecorder = eventrecorder.EventRecorder("EventRecorder")
+        self.onlineMetrics = None  # KPIs aggregated while simulating instead of logging visits, if any
+        self.steadyStateDetector = None  # detects the end of the warm-up and when the run can stop, if any
+        self.memoryBudget = None  # spills the logs over simulation time to disk when exceeded, if any
 
-        self.stationsAvailable = []
-        self.resourcesAvailable = []
-        self.existingOrders = []
+        # free resources and the number of available stations, updated whenever they are taken or freed
+        self.freeResources = freepool.FreePool("freeResources", n_resources)
+        self.availableStations = n_stations
+
+        # enterprise variables over simulation time
+        self.stationsAvailable = changelog.ChangeLog("stationsAvailable")
+        self.resourcesAvailable = changelog.ChangeLog("resourcesAvailable")
+        self.existingOrders = changelog.ChangeLog("existingOrders")
 
         print("done!")
+
+    def sampleRoutes(self, k):
+        # sample k station plans (lists of station indices) in one vectorized pass
+        return self.routeSampler.sampleRoutes(k)
+
+    # stations and resources log their availability only when it changes,
+    # availabilities are not logged if only online metrics are aggregated
+
+    def acquireStation(self, station, sim_time):
+        station.available = False
+        self.availableStations -= 1
+        if self.onlineMetrics is None:
+            station.availabilityLog.record(sim_time, False)
+        return
+
+    def releaseStation(self, station, sim_time):
+        station.available = True
+        self.availableStations += 1
+        if self.onlineMetrics is None:
+            station.availabilityLog.record(sim_time, True)
+        return
+
+    def acquireResource(self, sim_time):
+        # take a free resource uniformly at random
+        chosen_resource = self.resources[self.freeResources.pop(
+            self.randomStreams.integer("resources", 0, len(self.freeResources)))]
+        chosen_resource.available = False
+        if self.onlineMetrics is None:
+            chosen_resource.availabilityLog.record(sim_time, False)
+        return chosen_resource
+
+    def releaseResource(self, resource, sim_time):
+        resource.available = True
+        self.freeResources.add(resource.resourceId)
+        if self.onlineMetrics is None:
+            resource.availabilityLog.record(sim_time, True)
+        return
+
+    def attachMemoryBudget(self, memory_budget):
+        # the logs over simulation time keep their values in memory only up to the budget
+        self.memoryBudget = memory_budget
+        self.stationsAvailable.attachBudget(memory_budget, "stations_available")
+        self.resourcesAvailable.attachBudget(memory_budget, "resources_available")
+        self.existingOrders.attachBudget(memory_budget, "existing_orders")
+        for station in self.stations:
+            station.availabilityLog.attachBudget(memory_budget, "station_" + str(station.stationId) + "_available")
+            station.performanceLog = chunkedseries.ChunkedSeries("performanceLog", memory_budget,
+                                                                 "station_" + str(station.stationId) + "_performance",
+                                                                 float, values=station.performanceLog)
+        for resource in self.resources:
+            resource.availabilityLog.attachBudget(memory_budget, "resource_" + str(resource.resourceId) + "_available")
+        return
+
+    def closeAvailabilityLogs(self, sim_time):
+        # the availabilities of all stations and resources hold until sim_time
+        for station in self.stations:
+            station.availabilityLog.extendTo(sim_time)
+        for resource in self.resources:
+            resource.availabilityLog.extendTo(sim_time)
+        return
@@ -0,0 +1,30 @@
+# This class works as the event calendar for the event driven simulation
+# It keeps the upcoming iterations in which something happens, e.g. stations finishing their orders
+
+import heapq
+
+
+class EventCalendar:
+
+    def __init__(self, calendar_name):
+
+        self.calendarName = calendar_name
+
+        self.eventTimes = []  # heap of simulation times at which events are due
+
+    def reset(self):
+        self.eventTimes = []
+        return
+
+    def schedule(self, event_time):
+        heapq.heappush(self.eventTimes, event_time)
+        return
+
+    def nextTime(self, sim_time):
+        # drop events that already passed and return the time of the next due event
+        while len(self.eventTimes) > 0 and self.eventTimes[0] < sim_time:
+            heapq.heappop(self.eventTimes)
+
+        if len(self.eventTimes) == 0:
+            return float("inf")
+        return self.eventTimes[0]
@@ -0,0 +1,87 @@
+# This class records the station visits of finished orders as an event log during the simulation
+# Every visit is one row in typed column buffers that grow by doubling their capacity,
+# the event log is generated from views on these buffers without collecting the orders afterwards
+# The visits of an order are recorded when the order finishes its last station, so the log only
+# contains complete traces, grouped by order in the sequence the orders were completed
+# When streaming, recorded visits are flushed to a LogStream in batches and the buffers are reused
+
+import numpy as np
+
+
+class EventRecorder:
+
+    columnTypes = {"order_id": np.int64,
+                   "station_id": np.int32,
+                   "resource_id": np.int32,
+                   "init_time": np.int64,
+                   "waiting_time": np.int64,
+                   "waiting_time_at_station": np.int64,
+                   "duration": np.int64,
+                   "mean_performance": np.float64,
+                   "start_time": np.int64,
+                   "end_time": np.int64}
+
+    def __init__(self, recorder_name, initial_capacity=4096):
+
+        self.recorderName = recorder_name
+
+        self.size = 0  # number of recorded visits
+        self.stream = None  # LogStream the recorded visits are flushed to, if any
+        self.flushSize = None  # number of recorded visits that triggers a flush to the stream
+        self.buffers = {column: np.zeros(initial_capacity, dtype=column_type)
+                        for column, column_type in self.columnTypes.items()}
+
+    def reserve(self, n_rows):
+        # make room for n_rows additional visits
+        capacity = len(self.buffers["order_id"])
+        if self.size + n_rows <= capacity:
+            return
+
+        while capacity < self.size + n_rows:
+            capacity *= 2
+        for column in self.buffers:
+            grown_buffer = np.zeros(capacity, dtype=self.buffers[column].dtype)
+            grown_buffer[:self.size] = self.buffers[column][:self.size]
+            self.buffers[column] = grown_buffer
+        return
+
+    def recordOrder(self, order):
+        # record all station visits of a finished order
+        n_visits = len(order.stationPlan)
+        self.reserve(n_visits)
+        rows = slice(self.size, self.size + n_visits)
+
+        self.buffers["order_id"][rows] = order.orderName
+        self.buffers["station_id"][rows] = order.stationPlan
+        self.buffers["resource_id"][rows] = order.resourceLog
+        self.buffers["init_time"][rows] = order.initTime
+        self.buffers["waiting_time"][rows] = order.waitingTimeLog
+        self.buffers["waiting_time_at_station"][rows] = order.waitingTimeAtStationLog
+        self.buffers["duration"][rows] = order.durationLog
+        self.buffers["mean_performance"][rows] = order.meanPerformanceLog
+        self.buffers["start_time"][rows] = order.stationStartWorkingTimes
+        self.buffers["end_time"][rows] = order.stationEndWorkingTimes
+
+        self.size += n_visits
+        return
+
+    def flushDue(self):
+        return self.stream is not None and self.size >= self.flushSize
+
+    def clear(self):
+        # release the recorded visits, e.g. after flushing them, but keep the buffers
+        self.size = 0
+        return
+
+    def column(self, column):
+        # view on the recorded values of a column, valid until the next visits are recorded
+        return self.buffers[column][:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        # only the recorded visits are kept when pickling, not the spare capacity of the buffers
+        state = self.__dict__.copy()
+        state["buffers"] = {column: buffer[:max(self.size, 1)].copy() for column, buffer in self.buffers.items()}
+        return state
@@ -0,0 +1,69 @@
+# This class runs export jobs, e.g. writing the logs of a simulated config, on a pool of background writer threads
+# so that the next simulation can start while the files of the last one are written
+# The number of pending jobs is bounded, submitting blocks while the queue is full, which also bounds
+# the memory held by the frames waiting to be written
+# Every job writes its files in sequence, so the last file of a job still marks all of its files as complete
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExportQueue:
+
+    def __init__(self, queue_name, n_writers=1, max_pending=2):
+
+        self.queueName = queue_name
+        self.executor = ThreadPoolExecutor(max_workers=n_writers, thread_name_prefix=queue_name)
+        self.slots = threading.BoundedSemaphore(max_pending)  # free places for pending (queued or running) jobs
+        self.futures = []
+
+    def submit(self, job, *args):
+        # run job(*args) in the background, blocks until a place in the queue is free
+        # failures of finished jobs are raised here instead of being lost until the end
+        self.raiseFailures()
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(job, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda finished_future: self.slots.release())
+        self.futures.append(future)
+        return future
+
+    def raiseFailures(self):
+        # raise the exception of the first failed job, successful jobs are forgotten
+        pending = []
+        for future in self.futures:
+            if not future.done():
+                pending.append(future)
+            elif future.exception() is not None:
+                raise future.exception()
+        self.futures = pending
+        return
+
+    def close(self):
+        # wait for all jobs to finish writing
+        self.executor.shutdown(wait=True)
+        self.raiseFailures()
+        return
+
+    def __enter__(self):
+        return self
+
+    def reportFailures(self):
+        # print the exceptions of all failed jobs instead of raising them
+        for future in self.futures:
+            if future.exception() is not None:
+                print("Warning: export job failed while handling another error: " + repr(future.exception()))
+        self.futures = []
+        return
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # the jobs are still written, but their failures must not replace the exception that ends the block
+            self.executor.shutdown(wait=True)
+            self.reportFailures()
+        return False
@@ -0,0 +1,38 @@
+# This class keeps the free items of a pool, e.g. the free resources of the enterprise, as an indexable set
+# Items are the indices 0..n-1 of the pooled objects, every item knows its position in the list of free items,
+# so adding, removing and taking the item at a (random) position are O(1) by swapping with the last free item
+# The order of the free items changes with every removal, which does not matter for uniform random picks
+
+class FreePool:
+
+    def __init__(self, pool_name, n_items):
+
+        self.poolName = pool_name
+        self.items = list(range(0, n_items))  # free items in arbitrary order
+        self.positions = list(range(0, n_items))  # position of every item in items, -1 if it is taken
+
+    def add(self, item):
+        if self.positions[item] == -1:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+        return
+
+    def remove(self, item):
+        self.pop(self.positions[item])
+        return
+
+    def pop(self, position):
+        # take the item at position, the last free item moves into its place
+        item = self.items[position]
+        last_item = self.items.pop()
+        if last_item != item:
+            self.items[position] = last_item
+            self.positions[last_item] = position
+        self.positions[item] = -1
+        return item
+
+    def __contains__(self, item):
+        return self.positions[item] != -1
+
+    def __len__(self):
+        return len(self.items)
@@ -3,9 +3,12 @@ import csv
 import json
 import numpy as np
 
-def generate_config(params):
+import configfile
 
-    file_name = "configs/" + str(params["n_stations"]) + "_stations_" + str(params["transition_procedure"]) + ".json"
+def generate_config(params, config_format="npz"):
+
+    # configs are written as npz with sparse transitions by default, "json" writes them as nested lists
+    file_name = "configs/" + str(params["n_stations"]) + "_stations_" + str(params["transition_procedure"]) + "." + config_format
     config_dict = {"STATION_COUNT": params["n_stations"],
                     "STATION_PROBS": params["transitions"],
                     "SHUFFLE_STATIONS": False,
@@ -14,8 +17,11 @@ def generate_config(params):
                     "ORDER_FREQUENCY": 0.00166667,
                     "ORDER_PRIORITIES": 5}
     
-    with open(file_name, "w") as outfile: 
-        json.dump(config_dict, outfile)
+    if config_format == "npz":
+        configfile.save_config(config_dict, file_name)
+    else:
+        with open(file_name, "w") as outfile:
+            json.dump(config_dict, outfile)
 
 def calc_transitions(params):
 
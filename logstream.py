@@ -0,0 +1,74 @@
+# This class writes a log to a file in consecutive chunks of rows
+# Supported formats are csv and the compressed columnar formats parquet and arrow ipc (requires pyarrow),
+# every chunk becomes a row group (parquet) or record batch (arrow) so readers can pick columns and chunks
+# csv streams can be pickled with a simulation checkpoint and continued after resuming from it
+
+import os
+
+# columnar export formats are optional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+# file extensions of the supported export formats
+EXPORT_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+
+class LogStream:
+
+    def __init__(self, stream_name, filename, output_format="csv"):
+
+        if output_format not in EXPORT_EXTENSIONS:
+            raise ValueError("unknown output format: " + str(output_format))
+        if output_format != "csv" and pa is None:
+            raise ImportError("exporting " + output_format + " files requires pyarrow")
+
+        self.streamName = stream_name
+        self.filename = filename
+        self.outputFormat = output_format
+
+        self.writer = None  # opened with the schema of the first chunk
+        self.schema = None
+        self.rowsWritten = 0
+        self.bytesWritten = 0  # size of a csv file after the last chunk
+
+    def write(self, frame):
+        # append the rows of a DataFrame to the file
+        if self.outputFormat == "csv":
+            frame.to_csv(self.filename, index=False, sep=',', mode='w' if self.writer is None else 'a',
+                         header=self.writer is None)
+            self.writer = self.filename
+            self.bytesWritten = os.path.getsize(self.filename)
+        else:
+            if self.writer is None:
+                self.schema = pa.Schema.from_pandas(frame, preserve_index=False)
+                if self.outputFormat == "parquet":
+                    self.writer = pq.ParquetWriter(self.filename, self.schema, compression="zstd")
+                else:
+                    self.writer = pa.ipc.new_file(self.filename, self.schema,
+                                                  options=pa.ipc.IpcWriteOptions(compression="zstd"))
+            self.writer.write_table(pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False))
+
+        self.rowsWritten += len(frame)
+        return
+
+    def close(self):
+        if self.writer is not None and self.outputFormat != "csv":
+            self.writer.close()
+        return
+
+    def truncate(self):
+        # drop rows that were appended after this stream was checkpointed
+        if self.writer is not None:
+            with open(self.filename, "r+b") as f:
+                f.truncate(self.bytesWritten)
+        return
+
+    def __getstate__(self):
+        # parquet and arrow files are only readable once closed, so they cannot be continued after a restart
+        if self.outputFormat != "csv":
+            raise ValueError("only csv streams can be checkpointed, not " + self.outputFormat)
+        return self.__dict__.copy()
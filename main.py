@@ -26,15 +26,80 @@ import numpy as np
 import pandas as pd
 import json
 import os
-from datetime import datetime
-from tqdm import tqdm
+import heapq
+import gzip
+import pickle
+from logstream import LogStream, EXPORT_EXTENSIONS
+from instrumentation import Instrumentation
+from onlinemetrics import OnlineMetrics
+from steadystate import SteadyStateDetector
+from memorybudget import MemoryBudget
+from exportqueue import ExportQueue
+from configfile import load_config, config_files as list_config_files
 
+EXPORT_WRITERS = 1  # background threads writing the logs of the configs in a sweep
+EXPORT_QUEUE_SIZE = 2  # exports pending in a sweep before the next config waits for the writers
+
+
+def simulate(sim_env, mode="tick", checkpoint_file=None, checkpoint_interval=None, instrumentation=None):
+
+    # continue an interrupted run from its latest checkpoint
+    if checkpoint_file is not None and os.path.exists(checkpoint_file):
+        restore_checkpoint(sim_env, checkpoint_file, mode)
 
-def simulate(sim_env):
     print("Simulating...")
 
-    # simulation step
-    for sim_step in tqdm(range(sim_env.timeManager.simDuration)):
+    # phase timings and progress reports, runs without instrumentation only report their progress
+    if instrumentation is None:
+        instrumentation = Instrumentation("Instrumentation")
+    instrumentation.start(sim_env.timeManager.simTime, sim_env.timeManager.simDuration)
+
+    # the tick engine steps through every second of the simulation,
+    # the event engine only runs the seconds in which something can happen
+    # and fast forwards the idle stretches in between
+    if mode == "tick":
+        simulate_ticks(sim_env, instrumentation, checkpoint_file, checkpoint_interval)
+    elif mode == "event":
+        simulate_events(sim_env, instrumentation, checkpoint_file, checkpoint_interval)
+    else:
+        raise ValueError("unknown simulation mode: " + str(mode))
+    instrumentation.finish(sim_env.timeManager.simTime)
+
+    # availabilities of stations and resources are only logged when they change
+    if sim_env.onlineMetrics is None:
+        sim_env.closeAvailabilityLogs(sim_env.timeManager.simTime)
+
+    # write the remaining visits of a streamed event log
+    if sim_env.eventRecorder.stream is not None:
+        flush_event_log(sim_env)
+        sim_env.eventRecorder.stream.close()
+
+    print("...done!")
+    return
+
+
+def simulate_ticks(sim_env, instrumentation, checkpoint_file=None, checkpoint_interval=None):
+
+    schedule_first_arrival(sim_env)
+    next_checkpoint = next_checkpoint_time(sim_env, checkpoint_interval)
+    next_batch = next_batch_time(sim_env)
+    steps_until_sample = instrumentation.sampleInterval
+    next_profile_time = instrumentation.nextProfileTime()
+
+    # simulation step, resumed runs continue at the checkpointed simulation time
+    for sim_step in range(sim_env.timeManager.simTime, sim_env.timeManager.simDuration):
+
+        # the steady state is checked whenever a batch of simulation time is complete
+        if sim_env.timeManager.simTime >= next_batch:
+            if steady_state_reached(sim_env):
+                break
+            next_batch = next_batch_time(sim_env)
+
+        if sim_env.timeManager.simTime >= next_checkpoint:
+            instrumentation.startPhase()
+            save_checkpoint(sim_env, checkpoint_file, "tick")
+            instrumentation.lap("checkpoint")
+            next_checkpoint = next_checkpoint_time(sim_env, checkpoint_interval)
 
         # simulate one iteration
 
@@ -46,369 +111,594 @@ def simulate(sim_env):
         #     sim_env.orderManager.generateOrder(np.random.choice(range(1, sim_env.orderManager.orderPriorities)),
         #                                        current_station_plan, sim_env.timeManager.simTime)
 
-        # generate new orders
-        # roll if order is to be generated this iteration
-        # roll for order priority
-        # include functionality for shuffling the planned stations (optional)
-        if np.random.uniform() <= sim_env.orderManager.orderFrequency:
-            # if STATION_PROBS are given as global priorities take first chunk of code
-            # Start 1 #
-            # plan_probs = np.random.uniform(0, 1, len(sim_env.stations))
-            # current_station_plan = [sim_env.stations[i] for i in range(0, len(sim_env.stations)) if
-            #                         plan_probs[i] <= sim_env.stationProbs[i]]
-            # if sim_env.shuffleStations is True:
-            #     current_station_plan = np.random.permutation(current_station_plan)
-            #
-            # sim_env.orderManager.generateOrder(np.random.choice(range(1, sim_env.orderManager.orderPriorities)),
-            #                                    current_station_plan, sim_env.timeManager.simTime)
-            # End 1 #
-
-            # Start 2 #
-            next_station = 0
-            current_station_plan = [0]
-            while next_station != len(sim_env.stationProbs) - 1:
-                next_station = np.random.choice(range(0, len(sim_env.stationProbs[next_station])), p=sim_env.stationProbs[next_station])
-                current_station_plan.append(next_station)
-            current_station_plan = [sim_env.stations[i] for i in current_station_plan]
-            sim_env.orderManager.generateOrder(np.random.choice(range(1, sim_env.orderManager.orderPriorities)),
-                                               current_station_plan, sim_env.timeManager.simTime)
-            # End 2 #
-
-        # manage orders
-        # check available stations
-        available_stations = [s for s in sim_env.stations if s.available is True]
-
-        # check available resources
-        available_resources = [r for r in sim_env.resources if r.available is True]
-
-        # check for idle orders
-        idle_orders = [o for o in sim_env.orderManager.orderList if
-                       o.idle is True and o.orderComplete is False]
-
-        #Todo
-        # - record place in queue for waiting before station
-
-        # sort idle orders according to remaining time to deadline (according to station plan) and priority
-        idle_orders.sort(key=lambda x: (x.timeToDeadline, x.orderPriority))
-
-        # check for idle at machine orders
-        idle_at_station_orders = [o for o in sim_env.orderManager.orderList if
-                                  o.idleAtStation is True and o.orderComplete is False]
-
-        # sort idle at station orders according to remaining time to deadline (according to station plan) and priority
-        idle_at_station_orders.sort(key=lambda x: (x.timeToDeadline, x.orderPriority))
-
-        # record station performance each iteration
-        for station in sim_env.stations:
-            station.performanceLog.append(station.performance)
-
-        # assign idle at station orders, i.e. orders waiting at stations
-        if len(idle_at_station_orders) > 0:
-            for order in idle_at_station_orders:
-                # assign free resource to the order waiting at a station
-                if len(available_resources) != 0:
-                    # let order wait at the desired station if no resource is available
-                    # else assign resource to order
-                    chosen_resource = np.random.choice(available_resources)
-                    chosen_resource.available = False
-                    order.setResource(chosen_resource)
-
-                    # remove this resource from list of available resources
-                    available_resources.pop(available_resources.index(chosen_resource))
-
-                    # set idle at station status to false for this order
-                    order.idleAtStation = False
-
-        # assign orders
-        if len(idle_orders) > 0:
-            for order in idle_orders:
-                next_station = order.getNextStation()
-                # check if planned next station is available
-                if len(available_stations) > 0 and next_station in available_stations:
-                    # assign current order to the desired station
-                    available_stations[available_stations.index(next_station)].available = False
-                    order.setStation(available_stations[available_stations.index(next_station)])
-                    order.idle = False
-
-                    # remove this station from list of available stations
-                    available_stations.pop(available_stations.index(next_station))
-
-                if order.currentStation is not None and len(available_resources) == 0:
-                    # let order wait at the desired station if no resource is available
-                    order.idleAtStation = True
-                elif order.currentStation is not None:
-                    chosen_resource = np.random.choice(available_resources)
-                    chosen_resource.available = False
-                    order.setResource(chosen_resource)
-
-                    # remove this resource from list of available resources
-                    available_resources.pop(available_resources.index(chosen_resource))
-
-                    # set idle at station status to false for this order
-                    order.idleAtStation = False
-
-        # work on the orders at stations with the assigned resources,
-        # i.e. increment durations, set available or remain unavailable
-        # stations and resources that are finishing orders in one iteration
-        # are set to available but can start working only in the next iteration
-
-        if len(sim_env.orderManager.orderList) > 0:
-            for order in sim_env.orderManager.orderList:
-
-                # deduct one time period from time to deadline for the order
-                order.timeToDeadline -= 1
-
-                if order.idle is True:
-                    # record waiting times (in front of stations)
-                    currentStationPlanIndices = [i for i, x in enumerate(order.stationPlan[:(len(order.stationLog)+1)]) if x == order.getNextStation()]
-                    order.waitingTimeLog[currentStationPlanIndices[-1]] += 1
-                elif order.idleAtStation is True:
-                    # record waiting times at stations
-                    currentStationPlanIndices = [i for i, x in enumerate(order.stationPlan[:len(order.stationLog)]) if x == order.currentStation]
-                    order.waitingTimeAtStationLog[currentStationPlanIndices[-1]] += 1
-                elif order.idle is False \
-                        and order.idleAtStation is False \
-                        and order.orderComplete is False:
-
-                    # for testing if a station finishes their task the duration baseline is needed
-                    # (and needs to be adjusted to introduce some variance)
-                    # this is calculated once when the order is first processed at a station with a certain resource
-                    if order.currentStationDuration is None:
-                        baseline_duration = order.currentStation.durationBaseline
-                        resource_productivity = order.currentResource.resourceProductivity
-                        station_performance = order.currentStation.performance
-
-                        individual_duration = round(
-                            (baseline_duration / resource_productivity / station_performance) * np.random.normal(1,
-                                                                                                                 0.05))
-                        order.currentStationDuration = individual_duration
-
-                    # record first working time at the station
-                    if order.durationLog[len(order.stationLog)-1] == 0:
-                        order.stationStartWorkingTimes.append(sim_env.timeManager.simTime)
-
-                    # record cycle times
-                    currentStationPlanIndices = [i for i, x in enumerate(order.stationPlan[:len(order.stationLog)]) if x == order.currentStation]
-                    currentStationLogIndices = [i for i, x in enumerate(order.stationLog) if x == order.currentStation]
-                    order.durationLog[currentStationPlanIndices[-1]] += 1
-                    # order.durationLog[order.stationPlan.index(order.currentStation)] += 1
-                    # adjust station performance due to station usage - check if station has below zero performance
-                    order.currentStation.performance -= np.random.uniform(0, sim_env.maxDegradationPerPeriod)
-                    if order.currentStation.performance < 0:
-                        order.currentStation.performance = 0
-
-                    # print(order.currentStationDuration)
-
-                    # check if stations finish their task in this iteration
-                    if order.durationLog[currentStationLogIndices[-1]] >= order.currentStationDuration:
-
-                        # record mean performance at station
-                        order.stationEndWorkingTimes.append(sim_env.timeManager.simTime)
-                        workstart = order.stationStartWorkingTimes[-1]
-                        workend = sim_env.timeManager.simTime
-
-                        mean_performance = sum(
-                            order.currentStation.performanceLog[workstart:workend]) / (workend - workstart)
-                        order.meanPerformanceLog.append(mean_performance)
-
-                        # send order to idle pool waiting for the next station of the order
-                        # leave current station as attribute for purposes of waiting time recording
-                        # if current station of the order is the last in the station plan send to completed orders
-                        if len(order.stationPlan) == len(order.stationLog):
-                            # orders with completeStatus == True remain in the order pool
-                            # but are not assigned to stations or resources as they are neither idle nor idleAtMachine
-                            # free resources and stations
-                            order.currentStation.available = True
-                            order.currentResource.available = True
-
-                            order.orderComplete = True
-                            order.unsetStation()
-
-                            sim_env.orderManager.completedOrders.append(order)
-                            sim_env.orderManager.orderList.pop(sim_env.orderManager.orderList.index(order))
-                        else:
-                            # free resources and stations
-                            # set idle status for order
-                            order.currentStation.available = True
-                            order.currentResource.available = True
-
-                            order.unsetStation()
-                            order.idle = True
-
-        # maintain stations when maintenance interval is reached (after all orders are worked on)
-        if sim_env.timeManager.simTime % sim_env.maintenanceInterval == 0:
-            for station in sim_env.stations:
-                station.performance = 1
-
-        # record the enterprise variables per iteration
-        sim_env.stationsAvailable.append(len([station for station in sim_env.stations if station.available is True]))
-        sim_env.resourcesAvailable.append(len([resource for resource in sim_env.resources if resource.available is True]))
-        sim_env.existingOrders.append(len([order for order in sim_env.orderManager.orderList]))
-
-        # record availabilities of stations and resources per iteration
-        for station in sim_env.stations:
-            station.availabilityLog.append(station.available)
-
-        for resource in sim_env.resources:
-            resource.availabilityLog.append(resource.available)
-
-        #Todo
-        # - record orders waiting in front of/before stations?
-        # - record place in waiting line for each order in each iteration?
-        # might be very complicated to export to an event log
-        # place in line at start of waiting period for that activity/station? orders to be processed before me
-
-        # increment simulation time
-        sim_env.timeManager.simTime += 1
+        # the profile window is opened and closed at the first step at or after its bounds
+        if sim_env.timeManager.simTime >= next_profile_time:
+            instrumentation.updateProfile(sim_env.timeManager.simTime)
+            next_profile_time = instrumentation.nextProfileTime()
 
-    print("...done!")
+        # the phases of every sampleInterval-th step are timed, timer is None in all other steps
+        steps_until_sample -= 1
+        if steps_until_sample == 0:
+            steps_until_sample = instrumentation.sampleInterval
+            timer = instrumentation.sampleStep(sim_env.timeManager.simTime)
+        else:
+            timer = None
+
+        # generate new orders if an arrival is due this iteration
+        if sim_env.timeManager.simTime == sim_env.orderManager.nextArrival:
+            generate_order(sim_env)
+            if timer is not None:
+                timer.lap("order_generation")
+
+        simulate_step(sim_env, timer=timer)
+
+    instrumentation.countSteps(instrumentation.sampleInterval - steps_until_sample)
+    return
+
+
+def simulate_events(sim_env, instrumentation, checkpoint_file=None, checkpoint_interval=None):
+
+    # resumed runs keep the events of their checkpoint
+    calendar = sim_env.eventCalendar
+    if sim_env.timeManager.simTime == 0:
+        calendar.reset()
+
+    schedule_first_arrival(sim_env)
+    next_checkpoint = next_checkpoint_time(sim_env, checkpoint_interval)
+    next_batch = next_batch_time(sim_env)
+    steps_until_sample = instrumentation.sampleInterval
+    next_profile_time = instrumentation.nextProfileTime()
+
+    while sim_env.timeManager.simTime < sim_env.timeManager.simDuration:
+
+        # the steady state is checked whenever a batch of simulation time is complete
+        if sim_env.timeManager.simTime >= next_batch:
+            if steady_state_reached(sim_env):
+                break
+            next_batch = next_batch_time(sim_env)
+
+        # fast forwarding may pass several checkpoint times, only the latest state is saved
+        if sim_env.timeManager.simTime >= next_checkpoint:
+            instrumentation.startPhase()
+            save_checkpoint(sim_env, checkpoint_file, "event")
+            instrumentation.lap("checkpoint")
+            next_checkpoint = next_checkpoint_time(sim_env, checkpoint_interval)
+
+        # the profile window is opened and closed at the first step at or after its bounds
+        if sim_env.timeManager.simTime >= next_profile_time:
+            instrumentation.updateProfile(sim_env.timeManager.simTime)
+            next_profile_time = instrumentation.nextProfileTime()
+
+        # the phases of every sampleInterval-th step are timed, timer is None in all other steps
+        steps_until_sample -= 1
+        if steps_until_sample == 0:
+            steps_until_sample = instrumentation.sampleInterval
+            timer = instrumentation.sampleStep(sim_env.timeManager.simTime)
+        else:
+            timer = None
+
+        # generate new orders if an arrival is due this iteration
+        if sim_env.timeManager.simTime == sim_env.orderManager.nextArrival:
+            generate_order(sim_env)
+            if timer is not None:
+                timer.lap("order_generation")
+
+        simulate_step(sim_env, calendar, timer)
+
+        # nothing changes until the next arrival, station completion or maintenance reset
+        # stations and resources freed by a completion can only be reassigned in the following iteration
+        # (maintenance resets only need an iteration of their own if performances are logged per iteration)
+        if sim_env.degradationModel.mode == "sampled":
+            next_maintenance = -(-sim_env.timeManager.simTime // sim_env.maintenanceInterval) * sim_env.maintenanceInterval
+        else:
+            next_maintenance = sim_env.timeManager.simDuration
+        next_event = min(sim_env.orderManager.nextArrival,
+                         calendar.nextTime(sim_env.timeManager.simTime),
+                         next_maintenance,
+                         sim_env.timeManager.simDuration)
+
+        if next_event > sim_env.timeManager.simTime:
+            if timer is not None:
+                timer.startPhase()
+            fast_forward(sim_env, next_event - sim_env.timeManager.simTime)
+            if timer is not None:
+                timer.lap("fast_forward")
+
+    instrumentation.countSteps(instrumentation.sampleInterval - steps_until_sample)
+    return
+
+
+def schedule_first_arrival(sim_env):
+
+    # orders arrive with a probability of orderFrequency per iteration,
+    # so the gaps between arrivals are geometrically distributed
+    if sim_env.orderManager.nextArrival is None:
+        sim_env.orderManager.nextArrival = sim_env.timeManager.simTime - 1 + \
+            sim_env.randomStreams.geometric("arrivals", sim_env.orderManager.orderFrequency)
+    return
+
+
+def generate_order(sim_env):
+
+    # roll for order priority
+    # include functionality for shuffling the planned stations (optional)
+
+    # if STATION_PROBS are given as global priorities take first chunk of code
+    # Start 1 #
+    # plan_probs = np.random.uniform(0, 1, len(sim_env.stations))
+    # current_station_plan = [sim_env.stations[i] for i in range(0, len(sim_env.stations)) if
+    #                         plan_probs[i] <= sim_env.stationProbs[i]]
+    # if sim_env.shuffleStations is True:
+    #     current_station_plan = np.random.permutation(current_station_plan)
+    #
+    # sim_env.orderManager.generateOrder(np.random.choice(range(1, sim_env.orderManager.orderPriorities)),
+    #                                    current_station_plan, sim_env.timeManager.simTime)
+    # End 1 #
+
+    # Start 2 #
+    # walk the transition probabilities from the first station until the last station is reached
+    current_station_plan = sim_env.routeSampler.nextRoute()
+    time_to_deadline = sum([sim_env.stations[i].durationBaseline for i in current_station_plan])
+    new_order = sim_env.orderManager.generateOrder(
+        sim_env.randomStreams.integer("priorities", 1, sim_env.orderManager.orderPriorities),
+        current_station_plan, sim_env.timeManager.simTime, time_to_deadline)
+    enqueue_order(sim_env, new_order)
+    # End 2 #
+
+    # roll the arrival of the next order
+    sim_env.orderManager.nextArrival += sim_env.randomStreams.geometric("arrivals", sim_env.orderManager.orderFrequency)
+    return
+
+
+def enqueue_order(sim_env, order):
+
+    # let an idle order wait in the queue of its next station
+    next_station = sim_env.stations[order.getNextStation()]
+    heapq.heappush(next_station.waitingQueue, (order.queueKey, order))
+    sim_env.dispatchStations.add(next_station)
+    return
+
+
+def simulate_step(sim_env, calendar=None, timer=None):
+
+    # the phases of sampled steps are timed with the instrumentation given as timer
+
+    # manage orders
+    # free resources are kept in a pool by the enterprise, so they are not looked up every iteration
+    sim_time = sim_env.timeManager.simTime
+
+    #Todo
+    # - record place in queue for waiting before station
+
+    # orders are served according to remaining time to deadline (according to station plan) and priority
+    # waiting orders are kept in priority queues that are only updated when orders change their state
+    # check for stations that became available or got new orders in their queue since the last iteration,
+    # the first order in the queue of each available station is assigned to it
+    dispatched_orders = []
+    for station in sim_env.dispatchStations:
+        if station.available is True and len(station.waitingQueue) > 0:
+            dispatched_orders.append(heapq.heappop(station.waitingQueue)[1])
+    sim_env.dispatchStations.clear()
+    if timer is not None:
+        timer.lap("list_building")
+
+    # assigned orders take resources in the same order as they would have been assigned
+    dispatched_orders.sort(key=lambda x: x.queueKey)
+    if timer is not None:
+        timer.lap("sorting")
+
+    # record station performance each iteration
+    sim_env.degradationModel.recordPerformances(sim_env.stations)
+    if timer is not None:
+        timer.lap("logging")
+
+    # assign idle at station orders, i.e. orders waiting at stations
+    order_manager = sim_env.orderManager
+    idle_at_station_queue = order_manager.idleAtStationQueue
+    started_orders = []
+    while len(idle_at_station_queue) > 0 and len(sim_env.freeResources) != 0:
+        # assign free resource to the order waiting at a station
+        # let order wait at the desired station if no resource is available
+        # else assign resource to order
+        order = heapq.heappop(idle_at_station_queue)[1]
+        chosen_resource = sim_env.acquireResource(sim_time)
+        order_manager.startWork(order, chosen_resource.resourceId, sim_time)
+        started_orders.append(order)
+
+    # assign orders
+    for order in dispatched_orders:
+        # assign current order to the desired station
+        next_station = sim_env.stations[order.getNextStation()]
+        sim_env.acquireStation(next_station, sim_time)
+        order_manager.dispatchOrder(order, next_station.stationId, sim_time)
+
+        if len(sim_env.freeResources) == 0:
+            # let order wait at the desired station if no resource is available
+            heapq.heappush(idle_at_station_queue, (order.queueKey, order))
+        else:
+            chosen_resource = sim_env.acquireResource(sim_time)
+            order_manager.startWork(order, chosen_resource.resourceId, sim_time)
+            started_orders.append(order)
+    if timer is not None:
+        timer.lap("assignment")
+
+    # work on the orders at stations with the assigned resources
+    # waiting times and durations are logged by the order manager when orders change their state,
+    # so only the orders that start or finish working in this iteration are touched
+    # (orders are handled in the sequence they were generated in, like the draws of the random streams)
+    # stations and resources that are finishing orders in one iteration
+    # are set to available but can start working only in the next iteration
+
+    # for testing if a station finishes their task the duration baseline is needed
+    # (and needs to be adjusted to introduce some variance)
+    # this is calculated once when the order is first processed at a station with a certain resource
+    for order in sorted(started_orders, key=lambda started_order: started_order.orderName):
+        current_station = sim_env.stations[order.currentStation]
+        baseline_duration = current_station.durationBaseline
+        resource_productivity = sim_env.resources[order.currentResource].resourceProductivity
+        station_performance = sim_env.degradationModel.startWork(current_station, sim_time)
+
+        individual_duration = round(
+            (baseline_duration / resource_productivity / station_performance) *
+            (1 + 0.05 * sim_env.randomStreams.standardNormal("durations")))
+
+        # the station finishes the order in the iteration its duration is reached
+        # and the freed station and resource can be reassigned in the iteration after that
+        completion_time = order_manager.scheduleCompletion(order, individual_duration)
+        if calendar is not None:
+            calendar.schedule(completion_time)
+            calendar.schedule(completion_time + 1)
+
+    # adjust station performance due to station usage (only drawn per iteration for sampled degradation)
+    if sim_env.degradationModel.mode == "sampled":
+        for order in sorted(order_manager.workingOrders.values(), key=lambda working_order: working_order.orderName):
+            sim_env.degradationModel.degrade(sim_env.stations[order.currentStation])
+
+    # orders whose stations finish their task in this iteration
+    for order in order_manager.dueCompletions(sim_time):
+
+        # record mean performance at station
+        visit = order.planPosition - 1
+        current_station = sim_env.stations[order.currentStation]
+        workstart = order.stationStartWorkingTimes[visit]
+        mean_performance = sim_env.degradationModel.finishWork(current_station, workstart, sim_time)
+        order.meanPerformanceLog[visit] = mean_performance
+
+        # free resources and stations
+        sim_env.releaseStation(current_station, sim_time)
+        sim_env.releaseResource(sim_env.resources[order.currentResource], sim_time)
+        sim_env.dispatchStations.add(current_station)
+
+        # send order to idle pool waiting for the next station of the order
+        # if current station of the order is the last in the station plan the order is retired
+        order_manager.finishVisit(order, sim_time)
+        if sim_env.onlineMetrics is not None:
+            sim_env.onlineMetrics.recordVisit(order, visit)
+        if order.orderComplete is True:
+            if sim_env.steadyStateDetector is not None:
+                sim_env.steadyStateDetector.recordOrder(order)
+            if sim_env.onlineMetrics is not None:
+                sim_env.onlineMetrics.recordOrder(order)
+            else:
+                sim_env.eventRecorder.recordOrder(order)
+                if sim_env.eventRecorder.flushDue():
+                    flush_event_log(sim_env)
+        else:
+            enqueue_order(sim_env, order)
+
+    if timer is not None:
+        timer.lap("work")
+
+    # maintain stations when maintenance interval is reached (after all orders are worked on)
+    sim_env.degradationModel.maintain(sim_env.stations, sim_env.timeManager.simTime)
+    if timer is not None:
+        timer.lap("maintenance")
+
+    # record the enterprise variables per iteration (logs only store changes),
+    # online metrics integrate the work in progress themselves, the log is only kept for a steady state detector
+    if sim_env.onlineMetrics is None or sim_env.steadyStateDetector is not None:
+        sim_env.existingOrders.record(sim_time, len(sim_env.orderManager.activeOrders))
+    if sim_env.onlineMetrics is not None:
+        sim_env.onlineMetrics.recordWip(sim_time, len(sim_env.orderManager.activeOrders))
+
+    # availabilities are only needed for the enterprise log, online metrics derive utilisation from the visits
+    # (the availabilities of single stations and resources are recorded when they are taken or freed)
+    if sim_env.onlineMetrics is None:
+        sim_env.stationsAvailable.record(sim_time, sim_env.availableStations)
+        sim_env.resourcesAvailable.record(sim_time, len(sim_env.freeResources))
+
+    #Todo
+    # - record orders waiting in front of/before stations?
+    # - record place in waiting line for each order in each iteration?
+    # might be very complicated to export to an event log
+    # place in line at start of waiting period for that activity/station? orders to be processed before me
+
+    if timer is not None:
+        timer.lap("logging")
+
+    # increment simulation time
+    sim_env.timeManager.simTime += 1
+    return
+
+
+def fast_forward(sim_env, n_steps):
+
+    # advance the simulation by n_steps iterations in which no order is assigned, started or finished
+    # and no station is maintained, i.e. only waiting times, durations and degradation accumulate
+
+    # stations degrade with every iteration they are working on an order
+    # (waiting times and durations of the orders are logged when they change their state)
+    if sim_env.degradationModel.mode == "sampled":
+        working_stations = set(sim_env.stations[order.currentStation]
+                               for order in sim_env.orderManager.workingOrders.values())
+        sim_env.degradationModel.fastForward(sim_env.stations, working_stations, n_steps)
+
+    # enterprise variables and availabilities are constant in between events
+    if sim_env.onlineMetrics is None or sim_env.steadyStateDetector is not None:
+        sim_env.existingOrders.extend(n_steps)
+
+    if sim_env.onlineMetrics is None:
+        sim_env.stationsAvailable.extend(n_steps)
+        sim_env.resourcesAvailable.extend(n_steps)
+
+    sim_env.timeManager.simTime += n_steps
     return
 
 
 def generate_event_log(simulated_enterprise):
 
     print("Generating event log...", end='')
+    event_log_frame = event_log_from_recorder(simulated_enterprise)
+    print("done!")
+    return event_log_frame
 
-    # form event log from all complete orders
-    complete_orders = simulated_enterprise.orderManager.completedOrders
+def generate_replica_event_log(replica_batch):
 
-    order_dict = {}
-    for order in complete_orders:
-        order_dict[order.orderName] = {'count': len(order.stationLog),
-                                       'init_time': order.initTime,
-                                       'stations': order.stationLog,
-                                       'mean_performances': order.meanPerformanceLog,
-                                       'resources': order.resourceLog,
-                                       'waiting_times': order.waitingTimeLog,
-                                       'waiting_times_at_stations': order.waitingTimeAtStationLog,
-                                       'durations': order.durationLog}
+    # event logs of all replicas simulated in lockstep in one frame, distinguished by their replica id
+    print("Generating replica event logs...", end='')
+    event_log_frames = []
+    for replica_id, recorder in enumerate(replica_batch.eventRecorders):
+        event_log_frame = event_log_from_recorder(replica_batch.enterprise, recorder)
+        event_log_frame.insert(0, "replica_id", np.full(len(event_log_frame), replica_id, dtype=np.int32))
+        event_log_frames.append(event_log_frame)
+    event_log_frame = pd.concat(event_log_frames, ignore_index=True)
+    print("done!")
+    return event_log_frame
+
+def event_log_from_recorder(simulated_enterprise, recorder=None):
+
+    # form event log from the visits recorded during the simulation
+    # (when streaming, only from the visits that were not flushed yet)
+    # the recorder of the enterprise is used unless another one is given, e.g. the one of a replica
+    recorder = simulated_enterprise.eventRecorder if recorder is None else recorder
+    station_names = [station.stationName for station in simulated_enterprise.stations]
+    resource_names = [resource.resourceName for resource in simulated_enterprise.resources]
+    resource_productivities = np.array([resource.resourceProductivity for resource in simulated_enterprise.resources])
 
     # fill the columns for the data frame
-    order_col = np.concatenate([np.repeat(entry, order_dict.get(entry).get('count')) for entry in order_dict])
-    station_col = [station.stationName for station in
-                   np.concatenate([order_dict.get(entry).get('stations') for entry in order_dict])]
-    mean_performance_col = np.concatenate([order_dict.get(entry).get('mean_performances') for entry in order_dict])
-    resource_col = [resource.resourceName for resource in
-                    np.concatenate([order_dict.get(entry).get('resources') for entry in order_dict])]
-    productivity_col = [resource.resourceProductivity for resource in
-                        np.concatenate([order_dict.get(entry).get('resources') for entry in order_dict])]
-    waiting_time_col = np.concatenate([order_dict.get(entry).get('waiting_times') for entry in order_dict])
-    waiting_time_at_stations_col = np.concatenate([order_dict.get(entry).get('waiting_times_at_stations')
-                                                   for entry in order_dict])
-    duration_col = np.concatenate([order_dict.get(entry).get('durations') for entry in order_dict])
-
-    timestamp_in_col = np.concatenate([np.repeat(order_dict.get(entry).get('init_time'),
-                                                 order_dict.get(entry).get('count')) for entry in order_dict])
-
-    # initialize further timestamp columns for saving times of the different
-    # process instances (i.e. waiting, working, etc.)
-    timestamp_at_station_col = [0] * len(order_col)
-    timestamp_start_work_col = [0] * len(order_col)
-    timestamp_out_col = [0] * len(order_col)
-
-    last_time = -1
-    current_order = -1
+    order_col = recorder.column("order_id").astype(np.int32)
+    station_col = pd.Categorical.from_codes(recorder.column("station_id"), categories=station_names)
+    mean_performance_col = recorder.column("mean_performance").astype(np.float32)
+    resource_col = pd.Categorical.from_codes(recorder.column("resource_id"), categories=resource_names)
+    productivity_col = resource_productivities[recorder.column("resource_id")]
+    waiting_time_col = recorder.column("waiting_time")
+    waiting_time_at_stations_col = recorder.column("waiting_time_at_station")
+    duration_col = recorder.column("duration")
 
     # calculate different timestamps for all orders and the traversed stations
-    for i in range(0, len(order_col)):
-
-        if current_order != order_col[i]:
-            last_time = -1
-            current_order = order_col[i]
-
-        if last_time >= 0:
-            timestamp_in_col[i] = last_time
-
-        timestamp_at_station_col[i] += timestamp_in_col[i] + \
-                                       waiting_time_col[i]
-
-        timestamp_start_work_col[i] += timestamp_in_col[i] + \
-                                       waiting_time_col[i] + \
-                                       waiting_time_at_stations_col[i]
-
-        timestamp_out_col[i] += timestamp_in_col[i] + \
-                                waiting_time_col[i] + \
-                                waiting_time_at_stations_col[i] + \
-                                duration_col[i]
-
-        last_time = timestamp_out_col[i]
-
-    # recode timestamp columns to actual timestamps
-    start_time = datetime.timestamp(datetime(2020, 1, 1, 0, 0, 0, 0))
-    timestamp_in_col = [datetime.fromtimestamp(start_time + timestamp) for timestamp in timestamp_in_col]
-    timestamp_at_station_col = [datetime.fromtimestamp(start_time + timestamp) for
-                                timestamp in timestamp_at_station_col]
-    timestamp_start_work_col = [datetime.fromtimestamp(start_time + timestamp) for
-                                timestamp in timestamp_start_work_col]
-    timestamp_out_col = [datetime.fromtimestamp(start_time + timestamp) for timestamp in timestamp_out_col]
-
-    # make DataFrame from all columns
-    event_log_frame = pd.DataFrame([order_col,
-                                    station_col,
-                                    mean_performance_col,
-                                    resource_col,
-                                    productivity_col,
-                                    waiting_time_col,
-                                    waiting_time_at_stations_col,
-                                    duration_col,
-                                    timestamp_in_col,
-                                    timestamp_at_station_col,
-                                    timestamp_start_work_col,
-                                    timestamp_out_col]).transpose()
+    # orders enter their first station at their init time and every further station when leaving the one before,
+    # i.e. the times orders leave stations are cumulative sums of waiting times and durations within each order
+    station_times = waiting_time_col + waiting_time_at_stations_col + duration_col
+    cumulative_times = np.cumsum(station_times)
+    order_starts = np.flatnonzero(np.diff(order_col, prepend=-1) != 0)
+    order_lengths = np.diff(np.append(order_starts, len(order_col)))
+    times_before_order = np.repeat(cumulative_times[order_starts] - station_times[order_starts], order_lengths)
+
+    timestamp_out_col = recorder.column("init_time") + cumulative_times - times_before_order
+    timestamp_in_col = timestamp_out_col - station_times
+    timestamp_at_station_col = timestamp_in_col + waiting_time_col
+    timestamp_start_work_col = timestamp_at_station_col + waiting_time_at_stations_col
+
+    # recode timestamp columns to actual timestamps, i.e. seconds since the start of the simulation
+    start_time = np.datetime64("2020-01-01T00:00:00", "s")
+    timestamp_in_col = start_time + timestamp_in_col.astype("timedelta64[s]")
+    timestamp_at_station_col = start_time + timestamp_at_station_col.astype("timedelta64[s]")
+    timestamp_start_work_col = start_time + timestamp_start_work_col.astype("timedelta64[s]")
+    timestamp_out_col = start_time + timestamp_out_col.astype("timedelta64[s]")
+
+    # make DataFrame from all columns, count columns are views on the buffers of the event recorder
+    event_log_frame = pd.DataFrame({"order_id": order_col,
+                                    "station": station_col,
+                                    "mean_performance": mean_performance_col,
+                                    "resource": resource_col,
+                                    "resource_productivity": productivity_col,
+                                    "waiting_time": waiting_time_col,
+                                    "waiting_time_at_station": waiting_time_at_stations_col,
+                                    "duration": duration_col,
+                                    "timestamp_in": timestamp_in_col,
+                                    "timestamp_at_station": timestamp_at_station_col,
+                                    "timestamp_start_work": timestamp_start_work_col,
+                                    "timestamp_out": timestamp_out_col},
+                                   copy=False)
 
-    # assign meaningful column names
-    event_log_frame.columns = ["order_id",
-                               "station",
-                               "mean_performance",
-                               "resource",
-                               "resource_productivity",
-                               "waiting_time",
-                               "waiting_time_at_station",
-                               "duration",
-                               "timestamp_in",
-                               "timestamp_at_station",
-                               "timestamp_start_work",
-                               "timestamp_out"]
-    print("done!")
     return event_log_frame
 
+def detect_steady_state(sim_env, batch_length=60*60, min_batches=10, steady_batches=None, precision=None):
+
+    # monitor WIP and cycle times in batches to find the end of the warm-up and stop early
+    # once steady_batches batches of the steady state were simulated or their means are precise enough
+    sim_env.steadyStateDetector = SteadyStateDetector("SteadyStateDetector", batch_length, min_batches,
+                                                      steady_batches, precision)
+    return
+
+def next_batch_time(sim_env):
+
+    if sim_env.steadyStateDetector is None:
+        return float("inf")
+    return sim_env.steadyStateDetector.nextBatchTime()
+
+def steady_state_reached(sim_env):
+
+    # close the finished batches and end the simulation if enough of the steady state was simulated,
+    # the simulation duration is shortened to the simulated time so that the logs cover the run
+    detector = sim_env.steadyStateDetector
+    if detector.update(sim_env.existingOrders, sim_env.timeManager.simTime) is False:
+        return False
+
+    print("Steady state reached after " + str(detector.warmUpEnd()) + "s, stopping at " +
+          str(sim_env.timeManager.simTime) + "s (" + detector.stopReason + ")")
+    sim_env.timeManager.simDuration = sim_env.timeManager.simTime
+    return True
+
+def mark_warm_up(event_log, warm_up_end, drop=False):
+
+    # orders that arrived before the end of the warm-up are marked or dropped
+    # (if no steady state was reached no warm-up is known and no order is marked)
+    start_time = np.datetime64("2020-01-01T00:00:00", "s")
+    arrival_times = event_log.groupby("order_id", sort=False)["timestamp_in"].transform("min")
+    if warm_up_end is None:
+        warm_up = np.zeros(len(event_log), dtype=bool)
+    else:
+        warm_up = (arrival_times.to_numpy(dtype="datetime64[s]") - start_time).astype(np.int64) < warm_up_end
+
+    if drop is True:
+        return event_log[~warm_up].reset_index(drop=True)
+    event_log["warm_up"] = warm_up
+    return event_log
+
+def next_checkpoint_time(sim_env, checkpoint_interval):
+
+    # checkpoints are taken every checkpoint_interval simulated seconds
+    if checkpoint_interval is None:
+        return float("inf")
+    return (sim_env.timeManager.simTime // checkpoint_interval + 1) * checkpoint_interval
+
+def save_checkpoint(sim_env, filename, mode):
+
+    # snapshot of the whole simulation state, i.e. the enterprise with its orders, logs, calendar,
+    # random streams and simulation time, compressed lightly to keep checkpointing fast
+    # written to a temporary file first so that an interruption never leaves a broken checkpoint
+    checkpoint = {"mode": mode, "enterprise": sim_env.__dict__}
+    with gzip.open(filename + ".tmp", "wb", compresslevel=1) as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(filename + ".tmp", filename)
+    return
+
+def restore_checkpoint(sim_env, filename, mode):
+
+    # replace the state of the enterprise with the state of the checkpoint
+    with gzip.open(filename, "rb") as f:
+        checkpoint = pickle.load(f)
+    if checkpoint["mode"] != mode:
+        raise ValueError("checkpoint of a " + checkpoint["mode"] + " simulation cannot be resumed in " + mode + " mode")
+    sim_env.__dict__.update(checkpoint["enterprise"])
+
+    # a streamed event log continues after the rows that were written until the checkpoint
+    if sim_env.eventRecorder.stream is not None:
+        sim_env.eventRecorder.stream.truncate()
+
+    print("Resuming from checkpoint at simulation time " + str(sim_env.timeManager.simTime))
+    return
+
+def stream_event_log(sim_env, filename, output_format="csv", batch_size=100000, checkpointed=False):
+
+    # write the event log while simulating, whenever batch_size visits of completed orders were recorded
+    # recorded visits are released once written so memory stays flat regardless of the simulation duration
+    # the stream is pickled with every checkpoint of a checkpointed run, which only works for csv files,
+    # so parquet and arrow streams are rejected before simulating
+    if checkpointed is True and output_format != "csv":
+        raise ValueError("only csv streams can be checkpointed, not " + output_format +
+                         " (set OUTPUT_FORMAT to csv or disable STREAM_EVENT_LOG or CHECKPOINT_INTERVAL)")
+    sim_env.eventRecorder.flushSize = batch_size
+    sim_env.eventRecorder.stream = LogStream("EventLogStream", filename, output_format)
+    return
+
+def flush_event_log(sim_env):
+
+    # append the recorded visits to the streamed event log and release them
+    recorder = sim_env.eventRecorder
+    if len(recorder) > 0:
+        recorder.stream.write(event_log_from_recorder(sim_env))
+        recorder.clear()
+    return
+
+def aggregate_online_metrics(sim_env, wip_period=60*60*24):
+
+    # aggregate KPIs while simulating instead of logging visits and availabilities,
+    # no event log or enterprise log can be generated from such a run
+    sim_env.onlineMetrics = OnlineMetrics("OnlineMetrics", sim_env.stations, sim_env.resources, wip_period=wip_period)
+    return
+
+def limit_memory(sim_env, max_bytes, spill_dir):
+
+    # keep the logs over simulation time in memory up to max_bytes and spill the rest to memory-mapped files
+    # in spill_dir, the logs are read back from there chunk by chunk when the enterprise log is generated
+    sim_env.attachMemoryBudget(MemoryBudget("MemoryBudget", max_bytes, spill_dir))
+    return
+
+def export_memory_report(sim_env, filename):
+
+    print("Exporting memory report...", end='')
+    with open(filename, "w") as f:
+        json.dump(sim_env.memoryBudget.report(), f, indent=2)
+    print("done!")
+    return
+
+def export_metrics_summary(sim_env, filename):
+
+    print("Exporting metrics summary...", end='')
+    with open(filename, "w") as f:
+        json.dump(sim_env.onlineMetrics.summary(sim_env), f, indent=2)
+    print("done!")
+    return
+
+def read_event_times(filename, output_format, sim_duration):
+
+    # event times of a streamed event log, only the timestamp columns are read
+    timestamp_columns = ["timestamp_in", "timestamp_at_station", "timestamp_start_work", "timestamp_out"]
+    if output_format == "csv":
+        event_log = pd.read_csv(filename, usecols=timestamp_columns, parse_dates=timestamp_columns)
+    elif output_format == "parquet":
+        event_log = pd.read_parquet(filename, columns=timestamp_columns)
+    else:
+        event_log = pd.read_feather(filename, columns=timestamp_columns)
+    return generate_event_times(event_log, sim_duration)
+
+def generate_event_times(event_log, sim_duration):
+
+    # sorted unique simulation times (seconds since the start of the simulation) at which events occurred
+    start_time = np.datetime64("2020-01-01T00:00:00", "s")
+    event_times = np.concatenate([(event_log[column].to_numpy(dtype="datetime64[s]") - start_time).astype(np.int64)
+                                  for column in ["timestamp_in",
+                                                 "timestamp_at_station",
+                                                 "timestamp_start_work",
+                                                 "timestamp_out"]])
+    event_times = np.unique(event_times)
+    return event_times[(event_times >= 0) & (event_times < sim_duration)]
+
 def generate_enterprise_log(simulated_enterprise, relevant_indices):
     print("Generating enterprise log...", end='')
 
-    # form enterprise log
+    # form enterprise log at the relevant simulation times only
     # fill the columns for the data frame
-    start_time = datetime.timestamp(datetime(2020, 1, 1, 0, 0, 0, 0))
-    timestamp_col = [datetime.fromtimestamp(start_time + iteration) for iteration in range(0, simulated_enterprise.timeManager.simDuration)]
-    timestamp_col = [timestamp_col[index] for index in relevant_indices]
-    stations_available_col = [simulated_enterprise.stationsAvailable[index] for index in relevant_indices]
-    resources_available_col = [simulated_enterprise.resourcesAvailable[index] for index in relevant_indices]
-    existing_orders_col = [simulated_enterprise.existingOrders[index] for index in relevant_indices]
-
-    station_dict = {}
-    for station in simulated_enterprise.stations:
-        station_dict[station.stationName] = [station.availabilityLog[index] for index in relevant_indices]
-
-    resource_dict = {}
-    for resource in simulated_enterprise.resources:
-        resource_dict[resource.resourceName] = [resource.availabilityLog[index] for index in relevant_indices]
+    relevant_indices = np.asarray(relevant_indices, dtype=np.int64)
+    start_time = np.datetime64("2020-01-01T00:00:00", "s")
 
-    # make DataFrame from all columns
-    enterprise_log_frame = pd.DataFrame([timestamp_col,
-                                         stations_available_col,
-                                         resources_available_col,
-                                         existing_orders_col]).transpose()
+    log_columns = {"timestamp": start_time + relevant_indices.astype("timedelta64[s]"),
+                   "stations_available": simulated_enterprise.stationsAvailable.valuesAt(relevant_indices),
+                   "resources_available": simulated_enterprise.resourcesAvailable.valuesAt(relevant_indices),
+                   "existing_orders": simulated_enterprise.existingOrders.valuesAt(relevant_indices)}
 
-    # assign meaningful column names
-    enterprise_log_frame.columns = ["timestamp",
-                                    "stations_available",
-                                    "resources_available",
-                                    "existing_orders"]
+    for station in simulated_enterprise.stations:
+        log_columns["station_" + str(station.stationName) + "_available"] = \
+            station.availabilityLog.valuesAt(relevant_indices)
 
-    for entry in station_dict:
-        enterprise_log_frame["station_" + str(entry) + "_available"] = station_dict[entry]
+    for resource in simulated_enterprise.resources:
+        log_columns["resource_" + str(resource.resourceName) + "_available"] = \
+            resource.availabilityLog.valuesAt(relevant_indices)
 
-    for entry in resource_dict:
-        enterprise_log_frame["resource_" + str(entry) + "_available"] = resource_dict[entry]
+    # make DataFrame from all columns at once instead of inserting them one by one
+    enterprise_log_frame = pd.DataFrame(log_columns, copy=False)
 
     print("done!")
     return enterprise_log_frame
@@ -445,136 +735,296 @@ def generate_parameter_frame(simulated_enterprise):
     print("done!")
     return station_frame, resource_frame
 
-def export_event_log(log, filename):
+def export_frame(frame, filename, output_format="csv", row_group_size=1000000):
+
+    # write a DataFrame as csv or as compressed columnar file (parquet or arrow ipc) in chunks of row_group_size rows
+    if output_format == "csv":
+        frame.to_csv(filename, index=False, sep=',')
+        return
+
+    stream = LogStream("ExportStream", filename, output_format)
+    for start_row in range(0, max(len(frame), 1), row_group_size):
+        stream.write(frame.iloc[start_row:start_row + row_group_size])
+    stream.close()
+    return
+
+def export_event_log(log, filename, output_format="csv"):
     print("Exporting event log...", end='')
-    log.to_csv(filename, index=False, sep=',')
+    export_frame(log, filename, output_format)
     print("done!")
     return
 
-def export_enterprise_log(log, filename):
+def export_enterprise_log(log, filename, output_format="csv"):
     print("Exporting enterprise log...", end='')
-    log.to_csv(filename, index=False, sep=',')
+    export_frame(log, filename, output_format)
     print("done!")
     return
 
-def export_parameter_frames(station_log, resource_log, station_filename, resource_filename):
+def export_parameter_frames(station_log, resource_log, station_filename, resource_filename, output_format="csv"):
     print("Exporting enterprise parameters...", end='')
-    station_log.to_csv(station_filename, index=False, sep=',')
-    resource_log.to_csv(resource_filename, index=False, sep=',')
+    export_frame(station_log, station_filename, output_format)
+    export_frame(resource_log, resource_filename, output_format)
     print("done!")
     return
 
-if __name__ == '__main__':
+def export_filenames(export_dir, config_file, output_format="csv", online_metrics=False):
+
+    # files written for a config, the resource parameters are written last
+    config_name = os.path.splitext(config_file)[0]
+    if online_metrics is True:
+        return [os.path.join(export_dir, config_name, "metrics_summary_" + config_name + ".json")]
+    extension = EXPORT_EXTENSIONS[output_format]
+    return [os.path.join(export_dir, config_name, prefix + config_name + extension)
+            for prefix in ["sim_event_log_", "sim_enterprise_log_", "stations_", "resources_"]]
+
+def set_default_params(params):
+
+    params["MAX_DEGRADATION_PER_PERIOD"] = 1/params["MAINTENANCE_INTERVAL"]
+
+    # simulation engine, i.e. "tick" for stepping through every second or "event" for jumping between events
+    params.setdefault("SIM_MODE", "tick")
+    # station degradation, i.e. "sampled" per second or in closed form with "expected" or "stochastic" degradation
+    params.setdefault("DEGRADATION_MODE", "expected")
+    # seed of the random streams, runs without seed are not reproducible
+    params.setdefault("SEED", None)
+    # format of the exported files, i.e. "csv", "parquet" or "arrow"
+    params.setdefault("OUTPUT_FORMAT", "csv")
+    # write the event log while simulating in batches of this many visits (None to write it afterwards)
+    params.setdefault("STREAM_EVENT_LOG", None)
+    # save the simulation state every this many simulated seconds to resume interrupted runs (None for no checkpoints)
+    params.setdefault("CHECKPOINT_INTERVAL", None)
+    # profile this [start, end) window of simulation time with cProfile (None for no profiling)
+    params.setdefault("PROFILE_WINDOW", None)
+    # trace memory allocations in the profile window with tracemalloc
+    params.setdefault("TRACE_MEMORY", False)
+    # only aggregate KPIs while simulating and export their summary instead of the logs
+    params.setdefault("ONLINE_METRICS", False)
+    # detect the steady state in batches of this many simulated seconds (None for no detection)
+    params.setdefault("STEADY_STATE_BATCH", None)
+    # batches simulated before the end of the warm-up is first looked for
+    params.setdefault("STEADY_STATE_MIN_BATCHES", 10)
+    # stop after this many batches of the steady state (None to run the whole simulation duration)
+    params.setdefault("STEADY_STATE_BATCHES", None)
+    # stop when the confidence intervals of the steady state WIP and cycle time are this narrow relative to their means
+    params.setdefault("STEADY_STATE_PRECISION", None)
+    # drop orders that arrived during the warm-up from the event log instead of marking them
+    params.setdefault("DROP_WARM_UP", False)
+    # bytes of the logs over simulation time kept in memory, the rest is spilled to the export directory
+    # (None to keep all logs in memory)
+    params.setdefault("MEMORY_BUDGET", None)
+    return params
+
+def build_enterprise(params):
+
+    # # initializing the enterprise for the simulation
+    # sim_enterprise = enterprise.Enterprise(enterprise_name="Enterprise",
+    #                                        n_stations=params["STATION_COUNT"],
+    #                                        station_names=range(0, params["STATION_COUNT"]),
+    #                                        station_probs=params["STATION_PROBS"],
+    #                                        station_durations=params["STATION_DURATIONS"],
+    #                                        shuffle_stations=params["SHUFFLE_STATIONS"],
+    #                                        maintenance_interval=params["MAINTENANCE_INTERVAL"],
+    #                                        max_degradation_per_period=params["MAX_DEGRADATION_PER_PERIOD"],
+    #                                        n_resources=params["RESOURCE_COUNT"],
+    #                                        resource_names=range(0, params["RESOURCE_COUNT"]),
+    #                                        resource_productivities=params["RESOURCE_PRODUCTIVITIES"],
+    #                                        sim_duration=params["SIM_DURATION"],
+    #                                        order_freq=params["ORDER_FREQUENCY"],
+    #                                        order_priorities=params["ORDER_PRIORITIES"])
+
+    # ensuring log completion (focus on control flow)
+    sim_enterprise = enterprise.Enterprise(enterprise_name="Enterprise",
+                                        n_stations=params["STATION_COUNT"],
+                                        station_names=range(0, params["STATION_COUNT"]),
+                                        station_probs=params["STATION_PROBS"],
+                                        station_durations=[150 for i in range(0, params["STATION_COUNT"])],
+                                        shuffle_stations=params["SHUFFLE_STATIONS"],
+                                        maintenance_interval=params["MAINTENANCE_INTERVAL"],
+                                        max_degradation_per_period=params["MAX_DEGRADATION_PER_PERIOD"],
+                                        n_resources=params["STATION_COUNT"],
+                                        resource_names=range(0, params["STATION_COUNT"]),
+                                        resource_productivities=[1 for i in range(0, params["STATION_COUNT"])],
+                                        sim_duration=params["SIM_DURATION"],
+                                        order_freq=params["ORDER_FREQUENCY"],
+                                        order_priorities=params["ORDER_PRIORITIES"],
+                                        degradation_mode=params["DEGRADATION_MODE"],
+                                        seed=params["SEED"])
+    return sim_enterprise
+
+def finish_memory_budget(sim_env, export_path, config_name):
+
+    # report the bytes per log and remove the spilled chunks once all logs were generated
+    if sim_env.memoryBudget is not None:
+        export_memory_report(sim_env, os.path.join(export_path, "memory_report_" + config_name + ".json"))
+        sim_env.memoryBudget.removeSpillFiles()
+    return
+
+def run_config(config_file, seed=None, config_dir="configs/", export_dir="export/", export_queue=None):
 
     #########################
     # SIMULATION PARAMETERS #
     #########################
 
-    config_files = os.listdir("configs/")
-
-    for config_file in config_files:
-
-        # config_file="500_stations_UNIFORM_UPPER_TRIANGLE.json"
-        with open("configs/" + config_file) as f:
-            params = json.load(f)
-
-        params["MAX_DEGRADATION_PER_PERIOD"] = 1/params["MAINTENANCE_INTERVAL"]
-
-        # # number of different activities
-        # STATION_COUNT = 10
-        # # execution probabilities of activities
-        # # STATION_PROBS = [1, 1, 0.8, 0.5, 1, 0.75, 0.8, 0.5, 1, 1]
-        # STATION_PROBS = [[0.0, 0.8, 0.2, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-        #                  [0.0, 0.0, 0.9, 0.1, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
-        #                  [0.0, 0.0, 0.0, 0.4, 0.3, 0.3, 0.0, 0.0, 0.0, 0.0],
-        #                  [0.0, 0.0, 0.0, 0.0, 0.3, 0.2, 0.4, 0.1, 0.0, 0.0],
-        #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.8, 0.2, 0.0, 0.0, 0.0],
-        #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.9, 0.1, 0.0, 0.0],
-        #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 0.5, 0.0],
-        #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.6, 0.4],
-        #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0],
-        #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]]
-        # # duration baselines for each individual station in seconds
-        # STATION_DURATIONS = [100, 200, 20, 60, 300, 500, 300, 100, 250, 60]
-        # # shuffle the stations for each order after stations are planned?
-        # SHUFFLE_STATIONS = False
-        # # how often are stations maintained?
-        # MAINTENANCE_INTERVAL = 60*60
-        # # how fast are stations degrading due to usage - max performance is 1, i.e. 100%
-        # MAX_DEGRADATION_PER_PERIOD = 1/MAINTENANCE_INTERVAL
-        # # number of available resources to work at stations
-        # RESOURCE_COUNT = 4
-        # # productivities of different resources
-        # RESOURCE_PRODUCTIVITIES = [0.75, 0.8, 0.8, 0.9, 1, 1, 1.2, 1.2, 1.5, 1.5]
-        # # total simulation duration in seconds
-        # SIM_DURATION = round(1 * 60 * 60 * 24)
-        # # frequency of order generation per second, i.e. probability per second for generation of order
-        # ORDER_FREQUENCY = 1/(60*10)  # one order every ten minutes
-        # # number of order priorities
-        # ORDER_PRIORITIES = 5
-
-        #########################
-        #########################
-        #########################
-
-        # # initializing the enterprise for the simulation
-        # sim_enterprise = enterprise.Enterprise(enterprise_name="Enterprise",
-        #                                        n_stations=params["STATION_COUNT"],
-        #                                        station_names=range(0, params["STATION_COUNT"]),
-        #                                        station_probs=params["STATION_PROBS"],
-        #                                        station_durations=params["STATION_DURATIONS"],
-        #                                        shuffle_stations=params["SHUFFLE_STATIONS"],
-        #                                        maintenance_interval=params["MAINTENANCE_INTERVAL"],
-        #                                        max_degradation_per_period=params["MAX_DEGRADATION_PER_PERIOD"],
-        #                                        n_resources=params["RESOURCE_COUNT"],
-        #                                        resource_names=range(0, params["RESOURCE_COUNT"]),
-        #                                        resource_productivities=params["RESOURCE_PRODUCTIVITIES"],
-        #                                        sim_duration=params["SIM_DURATION"],
-        #                                        order_freq=params["ORDER_FREQUENCY"],
-        #                                        order_priorities=params["ORDER_PRIORITIES"])
-        
-        # ensuring log completion (focus on control flow)
-        sim_enterprise = enterprise.Enterprise(enterprise_name="Enterprise",
-                                            n_stations=params["STATION_COUNT"],
-                                            station_names=range(0, params["STATION_COUNT"]),
-                                            station_probs=params["STATION_PROBS"],
-                                            station_durations=[150 for i in range(0, params["STATION_COUNT"])],
-                                            shuffle_stations=params["SHUFFLE_STATIONS"],
-                                            maintenance_interval=params["MAINTENANCE_INTERVAL"],
-                                            max_degradation_per_period=params["MAX_DEGRADATION_PER_PERIOD"],
-                                            n_resources=params["STATION_COUNT"],
-                                            resource_names=range(0, params["STATION_COUNT"]),
-                                            resource_productivities=[1 for i in range(0, params["STATION_COUNT"])],
-                                            sim_duration=params["SIM_DURATION"],
-                                            order_freq=params["ORDER_FREQUENCY"],
-                                            order_priorities=params["ORDER_PRIORITIES"])
-
-
-        # run the simulation in the generated enterprise
-        simulate(sim_enterprise)
 
+    # config_file="500_stations_UNIFORM_UPPER_TRIANGLE.json"
+    params = load_config(os.path.join(config_dir, config_file))
+
+    # seed given by the caller, e.g. a sweep, unless the config has its own
+    if params.get("SEED") is None:
+        params["SEED"] = seed
+
+    set_default_params(params)
+
+    # # number of different activities
+    # STATION_COUNT = 10
+    # # execution probabilities of activities
+    # # STATION_PROBS = [1, 1, 0.8, 0.5, 1, 0.75, 0.8, 0.5, 1, 1]
+    # STATION_PROBS = [[0.0, 0.8, 0.2, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+    #                  [0.0, 0.0, 0.9, 0.1, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+    #                  [0.0, 0.0, 0.0, 0.4, 0.3, 0.3, 0.0, 0.0, 0.0, 0.0],
+    #                  [0.0, 0.0, 0.0, 0.0, 0.3, 0.2, 0.4, 0.1, 0.0, 0.0],
+    #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.8, 0.2, 0.0, 0.0, 0.0],
+    #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.9, 0.1, 0.0, 0.0],
+    #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 0.5, 0.0],
+    #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.6, 0.4],
+    #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0],
+    #                  [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]]
+    # # duration baselines for each individual station in seconds
+    # STATION_DURATIONS = [100, 200, 20, 60, 300, 500, 300, 100, 250, 60]
+    # # shuffle the stations for each order after stations are planned?
+    # SHUFFLE_STATIONS = False
+    # # how often are stations maintained?
+    # MAINTENANCE_INTERVAL = 60*60
+    # # how fast are stations degrading due to usage - max performance is 1, i.e. 100%
+    # MAX_DEGRADATION_PER_PERIOD = 1/MAINTENANCE_INTERVAL
+    # # number of available resources to work at stations
+    # RESOURCE_COUNT = 4
+    # # productivities of different resources
+    # RESOURCE_PRODUCTIVITIES = [0.75, 0.8, 0.8, 0.9, 1, 1, 1.2, 1.2, 1.5, 1.5]
+    # # total simulation duration in seconds
+    # SIM_DURATION = round(1 * 60 * 60 * 24)
+    # # frequency of order generation per second, i.e. probability per second for generation of order
+    # ORDER_FREQUENCY = 1/(60*10)  # one order every ten minutes
+    # # number of order priorities
+    # ORDER_PRIORITIES = 5
+
+    #########################
+    #########################
+    #########################
+
+    # initializing the enterprise for the simulation
+    sim_enterprise = build_enterprise(params)
+
+    config_name = os.path.splitext(config_file)[0]
+    export_path = os.path.join(export_dir, config_name)
+    # the export directory itself may not exist yet either, e.g. when given to the sweep
+    os.makedirs(export_path, exist_ok=True)
+
+    output_filenames = export_filenames(export_dir, config_file, params["OUTPUT_FORMAT"], params["ONLINE_METRICS"])
+
+    if params["ONLINE_METRICS"] is True:
+        # aggregate KPIs while simulating instead of logging
+        aggregate_online_metrics(sim_enterprise)
+    elif params["STREAM_EVENT_LOG"] is not None:
+        # export the event log while simulating
+        stream_event_log(sim_enterprise, output_filenames[0], params["OUTPUT_FORMAT"], params["STREAM_EVENT_LOG"],
+                         checkpointed=params["CHECKPOINT_INTERVAL"] is not None)
+
+    if params["MEMORY_BUDGET"] is not None:
+        # spill the logs over simulation time to disk beyond the memory budget
+        limit_memory(sim_enterprise, params["MEMORY_BUDGET"], os.path.join(export_path, "spill"))
+
+    if params["STEADY_STATE_BATCH"] is not None:
+        # find the end of the warm-up and stop early once enough of the steady state was simulated
+        detect_steady_state(sim_enterprise, params["STEADY_STATE_BATCH"], params["STEADY_STATE_MIN_BATCHES"],
+                            params["STEADY_STATE_BATCHES"], params["STEADY_STATE_PRECISION"])
+
+    # run the simulation in the generated enterprise, continuing from the checkpoint of an interrupted run
+    checkpoint_filename = os.path.join(export_path, "checkpoint_" + config_name + ".pkl.gz")
+    sim_instrumentation = Instrumentation("Instrumentation", profile_window=params["PROFILE_WINDOW"],
+                                          trace_memory=params["TRACE_MEMORY"])
+    simulate(sim_enterprise, mode=params["SIM_MODE"], checkpoint_file=checkpoint_filename,
+             checkpoint_interval=params["CHECKPOINT_INTERVAL"], instrumentation=sim_instrumentation)
+    if os.path.exists(checkpoint_filename):
+        os.remove(checkpoint_filename)
+
+    # export the phase timings (and profile) of the simulation
+    sim_instrumentation.writeReport(os.path.join(export_path, "simulation_report_" + config_name + ".json"))
+
+    if sim_enterprise.steadyStateDetector is not None:
+        # export the batch means and the detected warm-up
+        with open(os.path.join(export_path, "steady_state_" + config_name + ".json"), "w") as f:
+            json.dump(sim_enterprise.steadyStateDetector.report(), f, indent=2)
+
+    if params["ONLINE_METRICS"] is True:
+        # export the aggregated KPIs only
+        export_metrics_summary(sim_enterprise, output_filenames[0])
+        finish_memory_budget(sim_enterprise, export_path, config_name)
+        print("Simulation and metrics export completed!")
+        return export_path
+
+    event_log_filename, enterprise_log_filename, station_filename, resource_filename = output_filenames
+
+    if params["STREAM_EVENT_LOG"] is not None:
+        # simulation times at which events occurred
+        event_log = None
+        relevant_indices = read_event_times(event_log_filename, params["OUTPUT_FORMAT"], sim_enterprise.timeManager.simDuration)
+    else:
         # generate an event log from the simulated enterprise data
         event_log = generate_event_log(sim_enterprise)
 
-        if not os.path.exists("export/" + os.path.splitext(config_file)[0]):
-            os.mkdir("export/" + os.path.splitext(config_file)[0])
+        # mark or drop the orders of the warm-up (streamed event logs are written before the warm-up is known)
+        if sim_enterprise.steadyStateDetector is not None:
+            event_log = mark_warm_up(event_log, sim_enterprise.steadyStateDetector.warmUpEnd(), params["DROP_WARM_UP"])
+
+        if export_queue is None:
+            # export the generated event log for the simulation
+            export_event_log(event_log, event_log_filename, params["OUTPUT_FORMAT"])
+
+        # simulation times at which events occurred
+        relevant_indices = generate_event_times(event_log, sim_enterprise.timeManager.simDuration)
 
-        # export the generated event log for the simulation
-        export_event_log(event_log, "export/" + os.path.splitext(config_file)[0] + "/sim_event_log_" + os.path.splitext(config_file)[0] + ".csv")
+    # generate the enterprise log with occupations per iteration
+    enterprise_log = generate_enterprise_log(sim_enterprise, relevant_indices)
 
-        all_event_timestamps = event_log["timestamp_in"].to_list() + event_log["timestamp_at_station"].to_list() + event_log["timestamp_start_work"].to_list() + event_log["timestamp_out"].to_list()
-        relevant_indices = [i for i, x in enumerate(pd.Series([datetime.fromtimestamp(datetime.timestamp(datetime(2020, 1, 1, 0, 0, 0, 0)) + iteration) for iteration in range(0, sim_enterprise.timeManager.simDuration)]).isin(set(all_event_timestamps)).to_list()) if x]
+    # generate DataFrame of station and resource parameters
+    station_frame, resource_frame = generate_parameter_frame(sim_enterprise)
+    finish_memory_budget(sim_enterprise, export_path, config_name)
 
-        # generate the enterprise log with occupations per iteration
-        enterprise_log = generate_enterprise_log(sim_enterprise, relevant_indices)
+    if export_queue is not None:
+        # write the logs in the background while the next config is simulated
+        exports = [(enterprise_log, enterprise_log_filename), (station_frame, station_filename),
+                   (resource_frame, resource_filename)]
+        if event_log is not None:
+            exports.insert(0, (event_log, event_log_filename))
+        export_queue.submit(write_exports, exports, params["OUTPUT_FORMAT"], config_name)
+        print("Simulation completed, exporting the logs in the background...")
+        return export_path
 
-        # export the generated enterprise log for the simulation
-        export_enterprise_log(enterprise_log, "export/" + os.path.splitext(config_file)[0] + "/sim_enterprise_log_" + os.path.splitext(config_file)[0] + ".csv")
+    # export the generated enterprise log for the simulation
+    export_enterprise_log(enterprise_log, enterprise_log_filename, params["OUTPUT_FORMAT"])
 
-        # generate DataFrame of station and resource parameters
-        station_frame, resource_frame = generate_parameter_frame(sim_enterprise)
+    # export generated parameter DataFrame
+    export_parameter_frames(station_frame, resource_frame, station_filename, resource_filename, params["OUTPUT_FORMAT"])
+
+    print("Simulation and data export completed! Have fun with your simulated process data (■_■¬)")
+    return export_path
+
+def write_exports(exports, output_format, config_name):
+
+    # export job of the export queue, the frames are written in sequence
+    # so the resource parameters are still written last and mark the outputs of the config as complete
+    for frame, filename in exports:
+        export_frame(frame, filename, output_format)
+    print("Data export of " + config_name + " completed! Have fun with your simulated process data (■_■¬)")
+    return
+
+if __name__ == '__main__':
 
-        # export generated parameter DataFrame
-        export_parameter_frames(station_frame, resource_frame, "export/" + os.path.splitext(config_file)[0] + "/stations_" + os.path.splitext(config_file)[0] + ".csv", "export/" + os.path.splitext(config_file)[0] + "/resources_" + os.path.splitext(config_file)[0] + ".csv")
+    config_files = list_config_files("configs/")
 
-        print("Simulation and data export completed! Have fun with your simulated process data (■_■¬)")
+    # the logs of every config are written by a background writer while the next config is simulated,
+    # the sweep only waits if the queue of pending exports is full and for all exports before it ends
+    with ExportQueue("ExportQueue", n_writers=EXPORT_WRITERS, max_pending=EXPORT_QUEUE_SIZE) as export_queue:
+        for config_file in config_files:
+            run_config(config_file, export_queue=export_queue)
@@ -0,0 +1,59 @@
+# This class limits the memory held by the chunked series of a simulation, i.e. their chunks and buffers
+# Values are kept in memory as long as they fit into the budget, every further value is spilled to a memory-mapped
+# file in the spill directory (see ChunkedSeries), so long runs only hold the values up to the budget in memory
+# (and at most one buffer block per series beyond it)
+# The report lists the bytes every registered series holds in memory and on disk
+
+import os
+
+
+class MemoryBudget:
+
+    def __init__(self, budget_name, max_bytes, spill_dir):
+
+        self.budgetName = budget_name
+        self.maxBytes = max_bytes
+        self.spillDir = spill_dir
+        self.memoryBytes = 0  # bytes of the chunks and buffers reserved in memory
+        self.series = dict()  # series whose chunks are limited by the budget by their spill name
+
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def register(self, series, spill_name):
+        # series reserve the memory of their values from the moment they are registered
+        self.series[spill_name] = series
+        return
+
+    def reserve(self, n_bytes):
+        # whether n_bytes of values can be kept in memory, they are then counted towards the budget
+        if self.memoryBytes + n_bytes > self.maxBytes:
+            return False
+        self.memoryBytes += n_bytes
+        return True
+
+    def release(self, n_bytes):
+        self.memoryBytes -= n_bytes
+        return
+
+    def report(self):
+        # bytes in memory and on disk per registered series and in total
+        series_bytes = {spill_name: {"length": len(series),
+                                     "memory_bytes": series.memoryBytes(),
+                                     "disk_bytes": series.diskBytes()}
+                        for spill_name, series in self.series.items()}
+        return {"max_bytes": self.maxBytes,
+                "memory_bytes": sum(entry["memory_bytes"] for entry in series_bytes.values()),
+                "disk_bytes": sum(entry["disk_bytes"] for entry in series_bytes.values()),
+                "series": series_bytes}
+
+    def removeSpillFiles(self):
+        # the spill files are only needed until the logs were generated from the series
+        for series in self.series.values():
+            if series.spillFile is not None and os.path.exists(series.spillFile):
+                os.remove(series.spillFile)
+        # the spill directory is removed as well unless it holds other files
+        try:
+            os.rmdir(self.spillDir)
+        except OSError:
+            pass
+        return
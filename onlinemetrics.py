@@ -0,0 +1,128 @@
+# This class aggregates the KPIs of a simulation while it runs instead of logging every visit
+# The visits of an order are added to running statistics per station when the order finishes its last station,
+# utilisation is derived from the time stations and resources spent on every visit when it finishes
+# instead of per-iteration availability logs, so neither the event log nor the availability logs have to be kept
+# (tests/test_onlinemetrics.py compares the utilisations to the ones of the availability logs)
+# The work in progress is integrated over simulation time whenever the number of existing orders changes,
+# in total and per period, so the number of existing orders does not have to be logged either
+
+import math
+
+import runningstatistics
+
+
+class OnlineMetrics:
+
+    def __init__(self, metrics_name, stations, resources, quantiles=(0.5, 0.9, 0.95, 0.99), wip_period=60*60*24):
+
+        self.metricsName = metrics_name
+        self.stationNames = [station.stationName for station in stations]
+        self.resourceNames = [resource.resourceName for resource in resources]
+        self.wipPeriod = wip_period  # simulation times per value of the work in progress over time
+
+        self.completedOrders = 0
+        self.orderCycleTimes = runningstatistics.RunningStatistics("orderCycleTimes", quantiles)
+        # time from arriving in front of a station until leaving it and the waiting share of that time
+        self.stationCycleTimes = [runningstatistics.RunningStatistics("stationCycleTimes", quantiles)
+                                  for i in range(0, len(stations))]
+        self.stationWaitingTimes = [runningstatistics.RunningStatistics("stationWaitingTimes", quantiles)
+                                    for i in range(0, len(stations))]
+        # iterations stations are occupied (waiting for a resource or working) and resources are working
+        self.stationBusyTimes = [0] * len(stations)
+        self.resourceBusyTimes = [0] * len(resources)
+        # number of existing orders since wipTime, up to which it is integrated per period of wipPeriod simulation times
+        self.wip = 0
+        self.wipTime = 0
+        self.maxWip = 0
+        self.wipIntegrals = []
+
+    def recordWip(self, sim_time, wip):
+        # number of existing orders from sim_time on, called in every iteration but only integrated when it changes
+        if wip != self.wip:
+            self.integrateWip(sim_time)
+            self.wip = wip
+            self.maxWip = max(self.maxWip, wip)
+        return
+
+    def integrateWip(self, sim_time):
+        # add the current work in progress from wipTime up to sim_time to the integrals of the periods in between
+        while self.wipTime < sim_time:
+            period = self.wipTime // self.wipPeriod
+            if period == len(self.wipIntegrals):
+                self.wipIntegrals.append(0)
+            period_end = min((period + 1) * self.wipPeriod, sim_time)
+            self.wipIntegrals[period] += self.wip * (period_end - self.wipTime)
+            self.wipTime = period_end
+        return
+
+    def recordVisit(self, order, visit):
+        # add the time the station and the resource were occupied by a finished visit of an order
+        # the station is occupied from the iteration the order is dispatched to it and the resource from the iteration
+        # the work starts, both are available again in the iteration the work finishes (like in the availability logs)
+        station = order.stationPlan[visit]
+        self.stationBusyTimes[station] += order.waitingTimeAtStationLog[visit] + order.durationLog[visit] - 1
+        self.resourceBusyTimes[order.resourceLog[visit]] += order.durationLog[visit] - 1
+        return
+
+    def recordOrder(self, order):
+        # add all station visits of a finished order to the statistics
+        self.completedOrders += 1
+        order_cycle_time = 0
+        for visit in range(0, len(order.stationPlan)):
+            station = order.stationPlan[visit]
+            waiting_time = order.waitingTimeLog[visit] + order.waitingTimeAtStationLog[visit]
+            cycle_time = waiting_time + order.durationLog[visit]
+
+            self.stationCycleTimes[station].add(cycle_time)
+            self.stationWaitingTimes[station].add(waiting_time)
+            order_cycle_time += cycle_time
+
+        self.orderCycleTimes.add(order_cycle_time)
+        return
+
+    def summary(self, sim_env):
+        # KPIs of the simulation so far
+        sim_time = sim_env.timeManager.simTime
+
+        # stations and resources are also busy with the current visits of the active orders
+        station_busy_times = list(self.stationBusyTimes)
+        resource_busy_times = list(self.resourceBusyTimes)
+        # (their times at the station so far are counted from the time they entered their current state)
+        for order in sim_env.orderManager.atStationOrders.values():
+            station_busy_times[order.currentStation] += sim_time - order.stateTime
+        for order in sim_env.orderManager.workingOrders.values():
+            visit = order.planPosition - 1
+            station_busy_times[order.currentStation] += order.waitingTimeAtStationLog[visit] + sim_time - order.stateTime
+            resource_busy_times[order.currentResource] += sim_time - order.stateTime
+
+        # the work in progress is constant since its last change
+        self.integrateWip(sim_time)
+        period_lengths = [min(self.wipPeriod, sim_time - period * self.wipPeriod)
+                          for period in range(0, len(self.wipIntegrals))]
+
+        station_utilisations = [busy_time / sim_time if sim_time > 0 else math.nan for busy_time in station_busy_times]
+        resource_utilisations = [busy_time / sim_time if sim_time > 0 else math.nan for busy_time in resource_busy_times]
+
+        summary = {"simulated_seconds": sim_time,
+                   "completed_orders": self.completedOrders,
+                   "throughput_per_day": self.completedOrders / sim_time * 60 * 60 * 24 if sim_time > 0 else math.nan,
+                   "order_cycle_time": self.orderCycleTimes.summary(),
+                   "station_utilisation": sum(station_utilisations) / len(station_utilisations),
+                   "resource_utilisation": sum(resource_utilisations) / len(resource_utilisations),
+                   "wip": {"mean": sum(self.wipIntegrals) / sim_time if sim_time > 0 else math.nan,
+                           "max": self.maxWip,
+                           "period_seconds": self.wipPeriod,
+                           "period_means": [integral / length
+                                            for integral, length in zip(self.wipIntegrals, period_lengths)]},
+                   "stations": [],
+                   "resources": []}
+
+        for i in range(0, len(self.stationNames)):
+            summary["stations"].append({"station": self.stationNames[i],
+                                        "utilisation": station_utilisations[i],
+                                        "cycle_time": self.stationCycleTimes[i].summary(),
+                                        "waiting_time": self.stationWaitingTimes[i].summary()})
+        for i in range(0, len(self.resourceNames)):
+            summary["resources"].append({"resource": self.resourceNames[i],
+                                         "utilisation": resource_utilisations[i]})
+        return summary
@@ -1,59 +1,84 @@
 # This class represents an order (case) that traverses the enterprise through different stations
+# Stations and resources are referenced by their index in the enterprise, the planned stations and
+# the metrics of every visit are kept in typed arrays sized by the length of the station plan
+
+from array import array
 
 
 class Order:
 
-    def __init__(self, order_name, order_priority, station_plan, init_time):
+    __slots__ = ("orderName",
+                 "orderPriority",
+                 "stationPlan",
+                 "initTime",
+                 "planPosition",
+                 "meanPerformanceLog",
+                 "resourceLog",
+                 "durationLog",
+                 "waitingTimeLog",
+                 "waitingTimeAtStationLog",
+                 "stationStartWorkingTimes",
+                 "stationEndWorkingTimes",
+                 "idle",
+                 "idleAtStation",
+                 "orderComplete",
+                 "currentStation",
+                 "currentResource",
+                 "currentStationDuration",
+                 "deadline",
+                 "stateTime",
+                 "queueKey")
+
+    def __init__(self, order_name, order_priority, station_plan, init_time, time_to_deadline):
 
         self.orderName = order_name
         self.orderPriority = order_priority
-        self.stationPlan = station_plan  # planned stations that have to be executed before the order is finished
+        self.stationPlan = array('i', station_plan)  # planned stations that have to be executed before the order is finished
         self.initTime = init_time
 
-        self.stationLog = []  # list of stations that were visited during the lifetime of the order
-        self.meanPerformanceLog = []  # list of mean performance for each station visited throughout the process
-        self.resourceLog = []  # list of resources that worked on the order during the lifetime of the order
-        self.durationLog = []  # list of durations at stations that were visited during the lifetime of the order
-        self.waitingTimeLog = [0]  # list of waiting times in front of stations during the lifetime of the order
-        self.waitingTimeAtStationLog = []  # list of waiting times at stations during the lifetime of the order
-        self.queueLog = [] # list of place in queue when waiting for a certain station
+        n_visits = len(self.stationPlan)
+        self.planPosition = 0  # number of planned stations that were entered so far
+        self.meanPerformanceLog = array('d', [0]) * n_visits  # mean performance for each station visited throughout the process
+        self.resourceLog = array('i', [-1]) * n_visits  # resources that worked on the order at each station
+        self.durationLog = array('q', [0]) * n_visits  # durations at stations that were visited during the lifetime of the order
+        self.waitingTimeLog = array('q', [0]) * n_visits  # waiting times in front of stations during the lifetime of the order
+        self.waitingTimeAtStationLog = array('q', [0]) * n_visits  # waiting times at stations during the lifetime of the order
+        self.stationStartWorkingTimes = array('q', [0]) * n_visits  # times when stations are entered and the order is being worked
+        self.stationEndWorkingTimes = array('q', [0]) * n_visits  # times when stations are left after the order was being worked
         self.idle = True
         self.idleAtStation = False
         self.orderComplete = False
-        self.stationStartWorkingTimes = []  # list of times when stations are entered and the order is being worked
-        self.stationEndWorkingTimes = []  # list of times when stations are left after the order was being worked
         self.currentStation = None
         self.currentResource = None
         self.currentStationDuration = None
-        self.timeToDeadline = sum([station.durationBaseline for station in self.stationPlan])
+        self.deadline = init_time + time_to_deadline  # simulation time the order should be completed by
+        self.stateTime = init_time  # simulation time the order entered its current state, see OrderManager
+
+        # time to deadline decreases for all orders alike, so orders keep their place relative to each other
+        # and can be ranked by their deadline in simulation time, then priority, then age
+        self.queueKey = (self.deadline, self.orderPriority, self.orderName)
+
+    @property
+    def stationLog(self):
+        # stations that were visited during the lifetime of the order
+        return self.stationPlan[:self.planPosition]
 
     def getNextStation(self):
-        # check stationLog
         # which station is the next one?
-        if len(self.stationLog) == 0:
-            return self.stationPlan[0]
-        else:
-            # return self.stationPlan[self.stationPlan.index(self.stationLog[-1]) + 1]
-            currentCurrentStationIndices = [i for i, x in enumerate(self.stationPlan[:len(self.stationLog)]) if x == self.stationLog[-1]]
-            return self.stationPlan[currentCurrentStationIndices[-1] + 1]
+        return self.stationPlan[self.planPosition]
 
     def setResource(self, resource):
-        self.resourceLog.append(resource)
+        self.resourceLog[self.planPosition - 1] = resource
         self.currentResource = resource
         return
 
     def setStation(self, station):
-        self.stationLog.append(station)
+        self.planPosition += 1
         self.currentStation = station
-        self.durationLog.append(0)
-        self.waitingTimeAtStationLog.append(0)
         return
 
     def unsetStation(self):
         self.currentStation = None
         self.currentResource = None
         self.currentStationDuration = None
-
-        if self.orderComplete is False:
-            self.waitingTimeLog.append(0)
         return
@@ -1,4 +1,9 @@
 # This class represents a manager that initializes the incoming orders
+# Active orders are kept by their name and grouped by their state, i.e. waiting in front of their next station,
+# waiting at their station for a resource or being worked, so orders are added, moved and retired in O(1)
+# and every phase of an iteration only touches the orders it needs
+# Waiting times and durations are logged when an order changes its state, from the time it entered the state,
+# so orders that just wait are not touched in every iteration
 
 import order
 
@@ -12,11 +17,75 @@ class OrderManager:
         self.orderPriorities = order_priorities
 
         self.orderCount = 0
-        self.orderList = list()
-        self.completedOrders = list()
+        self.nextArrival = None  # simulation time of the next order arrival
+        self.activeOrders = dict()  # orders that are not completed yet by their name
+        self.waitingOrders = dict()  # active orders waiting in front of their next station
+        self.atStationOrders = dict()  # active orders waiting at their station for a resource
+        self.workingOrders = dict()  # active orders being worked at their station
+        self.completions = dict()  # working orders by the iteration they finish their current visit in
+        self.idleAtStationQueue = list()  # priority queue of orders waiting at their station for a resource
 
-    def generateOrder(self, order_priority, station_plan, init_time):
+    def generateOrder(self, order_priority, station_plan, init_time, time_to_deadline):
         self.orderCount += 1
-        new_order = order.Order(self.orderCount, order_priority, station_plan, init_time)
-        self.orderList.append(new_order)
+        new_order = order.Order(self.orderCount, order_priority, station_plan, init_time, time_to_deadline)
+        self.activeOrders[new_order.orderName] = new_order
+        self.waitingOrders[new_order.orderName] = new_order
+        return new_order
+
+    def dispatchOrder(self, dispatched_order, station, sim_time):
+        # the order leaves the queue of its next station and waits at the station for a resource
+        dispatched_order.waitingTimeLog[dispatched_order.planPosition] = sim_time - dispatched_order.stateTime
+        dispatched_order.setStation(station)
+        dispatched_order.idle = False
+        dispatched_order.idleAtStation = True
+        dispatched_order.stateTime = sim_time
+        del self.waitingOrders[dispatched_order.orderName]
+        self.atStationOrders[dispatched_order.orderName] = dispatched_order
+        return
+
+    def startWork(self, started_order, resource, sim_time):
+        # the order got a resource and is worked at its station from this iteration on
+        visit = started_order.planPosition - 1
+        started_order.waitingTimeAtStationLog[visit] = sim_time - started_order.stateTime
+        started_order.stationStartWorkingTimes[visit] = sim_time
+        started_order.setResource(resource)
+        started_order.idleAtStation = False
+        started_order.stateTime = sim_time
+        del self.atStationOrders[started_order.orderName]
+        self.workingOrders[started_order.orderName] = started_order
+        return
+
+    def scheduleCompletion(self, working_order, duration):
+        # the station finishes the order in the iteration its duration is reached
+        working_order.currentStationDuration = duration
+        completion_time = working_order.stateTime + max(duration, 1) - 1
+        self.completions.setdefault(completion_time, []).append(working_order)
+        return completion_time
+
+    def dueCompletions(self, sim_time):
+        # orders that finish their current visit in this iteration in the sequence they were generated in
+        return sorted(self.completions.pop(sim_time, []), key=lambda due_order: due_order.orderName)
+
+    def finishVisit(self, finished_order, sim_time):
+        # the order leaves its station, it waits for its next station from the next iteration on
+        # or is retired if this was its last station
+        visit = finished_order.planPosition - 1
+        finished_order.durationLog[visit] = sim_time - finished_order.stateTime + 1
+        finished_order.stationEndWorkingTimes[visit] = sim_time
+        finished_order.unsetStation()
+        del self.workingOrders[finished_order.orderName]
+
+        if len(finished_order.stationPlan) == finished_order.planPosition:
+            self.retireOrder(finished_order)
+        else:
+            finished_order.idle = True
+            finished_order.stateTime = sim_time + 1
+            self.waitingOrders[finished_order.orderName] = finished_order
+        return
+
+    def retireOrder(self, retired_order):
+        # completed orders leave the active orders and are released,
+        # their visits are kept by the event recorder (or the online metrics)
+        retired_order.orderComplete = True
+        del self.activeOrders[retired_order.orderName]
         return
@@ -0,0 +1,90 @@
+# This class provides the random numbers for the simulation
+# Every source of randomness draws from its own seeded stream so that runs are reproducible for a given seed
+# and changing how often one part of the simulation draws does not shift the numbers of the others
+# Scalar draws are served from buffers that are refilled in large blocks to avoid numpy overhead per draw
+
+import numpy as np
+
+
+class RandomStreams:
+
+    streamNames = ("arrivals", "priorities", "routing", "durations", "degradation", "resources")
+
+    def __init__(self, streams_name, seed=None, block_size=65536):
+
+        self.streamsName = streams_name
+        self.blockSize = block_size
+
+        # independent child seeds for every stream, the entropy is kept to report the seed of unseeded runs
+        seed_sequence = np.random.SeedSequence(seed)
+        self.seed = seed_sequence.entropy
+        self.generators = {name: np.random.Generator(np.random.PCG64(child_sequence))
+                           for name, child_sequence in zip(self.streamNames, seed_sequence.spawn(len(self.streamNames)))}
+
+        self.buffers = {}  # pre-drawn numbers per stream and distribution
+        self.positions = {}  # position of the next number in each buffer
+        self.blockStates = {}  # generator state each buffer was drawn from, buffers are redrawn from it when unpickling
+
+    def generator(self, stream):
+        # generator of a stream for vectorized draws
+        return self.generators[stream]
+
+    def uniform(self, stream):
+        # uniform random number in [0, 1)
+        key = (stream, "uniform")
+        if self.positions.get(key, self.blockSize) == self.blockSize:
+            self.refill(key)
+        return self.next(key)
+
+    def standardNormal(self, stream):
+        key = (stream, "normal")
+        if self.positions.get(key, self.blockSize) == self.blockSize:
+            self.refill(key)
+        return self.next(key)
+
+    def geometric(self, stream, p):
+        # number of bernoulli trials with success probability p up to and including the first success
+        key = (stream, "geometric", p)
+        if self.positions.get(key, self.blockSize) == self.blockSize:
+            self.refill(key)
+        return self.next(key)
+
+    def integer(self, stream, low, high):
+        # uniform random integer in [low, high)
+        return low + int(self.uniform(stream) * (high - low))
+
+    def drawBlock(self, key, generator):
+        # block of numbers for a buffer, key is (stream, distribution, parameters)
+        if key[1] == "uniform":
+            return generator.random(self.blockSize)
+        if key[1] == "normal":
+            return generator.standard_normal(self.blockSize)
+        return generator.geometric(key[2], self.blockSize)
+
+    def refill(self, key):
+        generator = self.generators[key[0]]
+        self.blockStates[key] = generator.bit_generator.state
+        # python lists are faster than numpy arrays for single element access
+        self.buffers[key] = self.drawBlock(key, generator).tolist()
+        self.positions[key] = 0
+        return
+
+    def next(self, key):
+        position = self.positions[key]
+        self.positions[key] = position + 1
+        return self.buffers[key][position]
+
+    def __getstate__(self):
+        # buffers of random numbers barely compress, so they are not pickled but drawn again from their generator states
+        state = self.__dict__.copy()
+        del state["buffers"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.buffers = {}
+        for key, block_state in self.blockStates.items():
+            generator = np.random.Generator(np.random.PCG64())
+            generator.bit_generator.state = block_state
+            self.buffers[key] = self.drawBlock(key, generator).tolist()
+        return
@@ -0,0 +1,345 @@
+# This class simulates independent replicas of one enterprise in lockstep
+# The state of all replicas is held in arrays with a leading replica axis, i.e. busy stations and resources,
+# queue lengths and a table of order slots with their station plans and visit logs per replica
+# Every step processes the arrivals, assignments and completions of all replicas with vectorized operations
+# and time jumps to the next event of any replica, so the interpreter overhead is shared by all replicas
+# Replicas follow the model of simulate() with the "expected" degradation mode, but their random numbers are drawn
+# in a different sequence, i.e. they are statistically equivalent to separate runs, not identical to seeded ones
+
+import numpy as np
+
+import randomstreams
+import routesampler
+import eventrecorder
+
+# states of the order slots
+FREE = 0  # no order in the slot
+QUEUED = 1  # waiting in front of its next station
+AT_STATION = 2  # waiting at its station for a resource
+WORKING = 3  # being worked at its station
+
+NO_EVENT = np.iinfo(np.int64).max  # completion time of stations that are not working
+
+
+class ReplicaBatch:
+
+    def __init__(self, batch_name, template_enterprise, n_replicas, seed=None, initial_orders=64):
+
+        if template_enterprise.degradationModel.mode != "expected":
+            raise ValueError("replicas in lockstep only support the expected degradation mode")
+        if template_enterprise.orderManager.orderPriorities > 16:
+            raise ValueError("replicas in lockstep support at most 16 order priorities")
+
+        print("Initializing " + str(n_replicas) + " replicas...", end='')
+
+        self.batchName = batch_name
+        self.enterprise = template_enterprise  # stations, resources and parameters shared by all replicas
+        self.nReplicas = n_replicas
+        self.randomStreams = randomstreams.RandomStreams("RandomStreams", seed)
+        self.routeSampler = routesampler.RouteSampler("RouteSampler", template_enterprise.stationProbs,
+                                                      self.randomStreams)
+
+        n_stations = len(template_enterprise.stations)
+        n_resources = len(template_enterprise.resources)
+        self.durationBaselines = np.array([station.durationBaseline for station in template_enterprise.stations],
+                                          dtype=np.float64)
+        self.productivities = np.array([resource.resourceProductivity for resource in template_enterprise.resources],
+                                       dtype=np.float64)
+        self.maintenanceInterval = template_enterprise.maintenanceInterval
+        self.degradationRate = template_enterprise.maxDegradationPerPeriod / 2  # expected degradation per iteration
+        self.simDuration = template_enterprise.timeManager.simDuration
+        self.orderFrequency = template_enterprise.orderManager.orderFrequency
+        self.orderPriorities = template_enterprise.orderManager.orderPriorities
+        self.simTime = 0
+
+        # arrivals and orders per replica
+        self.nextArrival = -1 + self.randomStreams.generator("arrivals").geometric(self.orderFrequency, n_replicas)
+        self.orderCount = np.zeros(n_replicas, dtype=np.int64)
+        self.existingOrders = np.zeros(n_replicas, dtype=np.int64)
+        self.waitingForResource = np.zeros(n_replicas, dtype=np.int64)  # orders at their station without a resource
+
+        # stations per replica, the degradation is tracked by the working iterations since the last maintenance
+        self.stationBusy = np.zeros((n_replicas, n_stations), dtype=bool)
+        self.stationOrder = np.full((n_replicas, n_stations), -1, dtype=np.int64)  # slot of the order at the station
+        self.stationEnd = np.full((n_replicas, n_stations), NO_EVENT, dtype=np.int64)  # iteration the work finishes in
+        self.queueLengths = np.zeros((n_replicas, n_stations), dtype=np.int64)
+        self.stationSegment = np.full((n_replicas, n_stations), -1, dtype=np.int64)  # maintenance interval of the last work
+        self.stationSegmentWork = np.zeros((n_replicas, n_stations), dtype=np.int64)  # working iterations in that interval
+        self.stationWorkBefore = np.zeros((n_replicas, n_stations), dtype=np.int64)  # ... before the current work started
+
+        # resources per replica
+        self.resourceBusy = np.zeros((n_replicas, n_resources), dtype=bool)
+        self.freeResources = np.full(n_replicas, n_resources, dtype=np.int64)
+
+        # order slots per replica and the visits of their station plans, both grow by doubling when full
+        self.orders = {"state": np.zeros((n_replicas, initial_orders), dtype=np.int8),
+                       "order_id": np.zeros((n_replicas, initial_orders), dtype=np.int64),
+                       "queue_key": np.zeros((n_replicas, initial_orders), dtype=np.int64),
+                       "init_time": np.zeros((n_replicas, initial_orders), dtype=np.int64),
+                       "plan_length": np.zeros((n_replicas, initial_orders), dtype=np.int64),
+                       "plan_position": np.zeros((n_replicas, initial_orders), dtype=np.int64),
+                       "next_station": np.zeros((n_replicas, initial_orders), dtype=np.int64),
+                       "ready_time": np.zeros((n_replicas, initial_orders), dtype=np.int64),
+                       "dispatch_time": np.zeros((n_replicas, initial_orders), dtype=np.int64)}
+        self.visits = {column: np.zeros((n_replicas, initial_orders, n_stations), dtype=column_type)
+                       for column, column_type in eventrecorder.EventRecorder.columnTypes.items()
+                       if column not in ("order_id", "init_time")}
+        self.eventRecorders = [eventrecorder.EventRecorder("EventRecorder") for i in range(0, n_replicas)]
+
+        # time integrals of the enterprise variables per replica
+        self.wipIntegral = np.zeros(n_replicas, dtype=np.int64)
+        self.busyStationIntegral = np.zeros(n_replicas, dtype=np.int64)
+        self.busyResourceIntegral = np.zeros(n_replicas, dtype=np.int64)
+
+        print("done!")
+
+    def simulate(self):
+        print("Simulating " + str(self.nReplicas) + " replicas in lockstep...", end='')
+        while self.simTime < self.simDuration:
+            self.generateOrders()
+            self.dispatchOrders()
+            self.assignResources()
+            self.completeVisits()
+
+            # the state after the step holds until the next event of any replica
+            next_time = min(self.nextEventTime(), self.simDuration)
+            n_steps = next_time - self.simTime
+            self.wipIntegral += self.existingOrders * n_steps
+            self.busyStationIntegral += self.stationBusy.sum(axis=1) * n_steps
+            self.busyResourceIntegral += (len(self.productivities) - self.freeResources) * n_steps
+            self.simTime = next_time
+        print("done!")
+        return
+
+    def nextEventTime(self):
+        # orders that can be dispatched or take a resource are handled in the next iteration
+        if (self.queueLengths[~self.stationBusy] > 0).any() or \
+                ((self.waitingForResource > 0) & (self.freeResources > 0)).any():
+            return self.simTime + 1
+        return min(self.nextArrival.min(), self.stationEnd.min())
+
+    def generateOrders(self):
+        arriving = np.flatnonzero(self.nextArrival == self.simTime)
+        if len(arriving) == 0:
+            return
+
+        # walk the transition probabilities from the first station until the last station is reached
+        routes = self.routeSampler.sampleRoutes(len(arriving))
+        plan_lengths = np.array([len(route) for route in routes], dtype=np.int64)
+        if plan_lengths.max() > self.visits["station_id"].shape[2]:
+            self.growPlans(plan_lengths.max())
+        slots = self.freeSlots(arriving)
+        time_to_deadlines = np.array([self.durationBaselines[route].sum() for route in routes], dtype=np.int64)
+        for replica, slot, route in zip(arriving.tolist(), slots.tolist(), routes):
+            self.visits["station_id"][replica, slot, :len(route)] = route
+
+        # orders are ranked by their deadline, then priority, then age, packed into one integer
+        self.orderCount[arriving] += 1
+        priorities = self.randomStreams.generator("priorities").integers(1, self.orderPriorities, len(arriving))
+        queue_keys = ((self.simTime + time_to_deadlines) << 32) | (priorities << 28) | self.orderCount[arriving]
+
+        self.orders["state"][arriving, slots] = QUEUED
+        self.orders["order_id"][arriving, slots] = self.orderCount[arriving]
+        self.orders["queue_key"][arriving, slots] = queue_keys
+        self.orders["init_time"][arriving, slots] = self.simTime
+        self.orders["plan_length"][arriving, slots] = plan_lengths
+        self.orders["plan_position"][arriving, slots] = 0
+        self.orders["next_station"][arriving, slots] = self.visits["station_id"][arriving, slots, 0]
+        self.orders["ready_time"][arriving, slots] = self.simTime
+        self.queueLengths[arriving, self.visits["station_id"][arriving, slots, 0]] += 1
+        self.existingOrders[arriving] += 1
+
+        # roll the arrival of the next order
+        self.nextArrival[arriving] += self.randomStreams.generator("arrivals").geometric(self.orderFrequency,
+                                                                                         len(arriving))
+        return
+
+    def freeSlots(self, replicas):
+        # first free order slot of every replica, the slots of all replicas are doubled if one is full
+        free = self.orders["state"][replicas] == FREE
+        slots = free.argmax(axis=1)
+        if not free[np.arange(0, len(replicas)), slots].all():
+            self.growOrders()
+            return self.freeSlots(replicas)
+        return slots
+
+    def growOrders(self):
+        for column in self.orders:
+            self.orders[column] = np.concatenate((self.orders[column], np.zeros_like(self.orders[column])), axis=1)
+        for column in self.visits:
+            self.visits[column] = np.concatenate((self.visits[column], np.zeros_like(self.visits[column])), axis=1)
+        return
+
+    def growPlans(self, plan_length):
+        # routes of transition probabilities with cycles can visit more stations than there are
+        for column in self.visits:
+            n_replicas, n_slots, n_visits = self.visits[column].shape
+            grown_visits = np.zeros((n_replicas, n_slots, max(plan_length, 2 * n_visits)), dtype=self.visits[column].dtype)
+            grown_visits[:, :, :n_visits] = self.visits[column]
+            self.visits[column] = grown_visits
+        return
+
+    def dispatchOrders(self):
+        # the first order in the queue of each available station is assigned to it
+        replicas, stations = np.nonzero(~self.stationBusy & (self.queueLengths > 0))
+        if len(replicas) == 0:
+            return
+
+        queued = (self.orders["state"][replicas] == QUEUED) & (self.orders["next_station"][replicas] == stations[:, None])
+        slots = np.where(queued, self.orders["queue_key"][replicas], NO_EVENT).argmin(axis=1)
+
+        positions = self.orders["plan_position"][replicas, slots]
+        self.visits["waiting_time"][replicas, slots, positions] = self.simTime - self.orders["ready_time"][replicas, slots]
+        self.orders["state"][replicas, slots] = AT_STATION
+        self.orders["dispatch_time"][replicas, slots] = self.simTime
+        self.orders["plan_position"][replicas, slots] += 1
+
+        self.stationBusy[replicas, stations] = True
+        self.stationOrder[replicas, stations] = slots
+        self.queueLengths[replicas, stations] -= 1
+        self.waitingForResource += np.bincount(replicas, minlength=self.nReplicas)
+        return
+
+    def assignResources(self):
+        assigning = (self.waitingForResource > 0) & (self.freeResources > 0)
+        replicas = np.flatnonzero(assigning)
+        if len(replicas) == 0:
+            return
+
+        # orders that were already waiting at their station take resources first, then the orders dispatched
+        # in this iteration, each by their queue key
+        rows, slots = np.nonzero(self.orders["state"][replicas] == AT_STATION)
+        rows = replicas[rows]
+        dispatched_now = self.orders["dispatch_time"][rows, slots] == self.simTime
+        ranking = np.lexsort((self.orders["queue_key"][rows, slots], dispatched_now, rows))
+        rows, slots = rows[ranking], slots[ranking]
+        ranks = np.arange(0, len(rows)) - np.searchsorted(rows, rows)
+        n_assigned = np.minimum(self.waitingForResource, self.freeResources)
+        assigned = ranks < n_assigned[rows]
+        rows, slots, ranks = rows[assigned], slots[assigned], ranks[assigned]
+
+        # every order takes a random free resource
+        random_keys = self.randomStreams.generator("resources").random((len(replicas), len(self.productivities)))
+        ranked_resources = np.argsort(np.where(self.resourceBusy[replicas], np.inf, random_keys), axis=1)
+        resources = ranked_resources[np.searchsorted(replicas, rows), ranks]
+        self.waitingForResource -= n_assigned * assigning
+        self.freeResources -= n_assigned * assigning
+        self.resourceBusy[rows, resources] = True
+
+        # the duration is calculated once when the order starts working at its station
+        visits = self.orders["plan_position"][rows, slots] - 1
+        stations = self.visits["station_id"][rows, slots, visits]
+        self.orders["state"][rows, slots] = WORKING
+        self.visits["waiting_time_at_station"][rows, slots, visits] = \
+            self.simTime - self.orders["dispatch_time"][rows, slots]
+        self.visits["resource_id"][rows, slots, visits] = resources
+        self.visits["start_time"][rows, slots, visits] = self.simTime
+
+        station_performances = self.startWork(rows, stations)
+        durations = np.rint(self.durationBaselines[stations] / self.productivities[resources] / station_performances *
+                            (1 + 0.05 * self.randomStreams.generator("durations").standard_normal(len(rows))))
+
+        # the station finishes the order in the iteration its duration is reached
+        self.stationEnd[rows, stations] = self.simTime + np.maximum(durations.astype(np.int64), 1) - 1
+        return
+
+    def completeVisits(self):
+        # stations and resources that finish orders in this iteration can start working only in the next iteration
+        replicas, stations = np.nonzero(self.stationEnd == self.simTime)
+        if len(replicas) == 0:
+            return
+
+        slots = self.stationOrder[replicas, stations]
+        visits = self.orders["plan_position"][replicas, slots] - 1
+        work_starts = self.visits["start_time"][replicas, slots, visits]
+        self.visits["end_time"][replicas, slots, visits] = self.simTime
+        self.visits["duration"][replicas, slots, visits] = self.simTime - work_starts + 1
+        self.visits["mean_performance"][replicas, slots, visits] = self.finishWork(replicas, stations, work_starts)
+
+        # free resources and stations
+        self.resourceBusy[replicas, self.visits["resource_id"][replicas, slots, visits]] = False
+        self.freeResources += np.bincount(replicas, minlength=self.nReplicas)
+        self.stationBusy[replicas, stations] = False
+        self.stationOrder[replicas, stations] = -1
+        self.stationEnd[replicas, stations] = NO_EVENT
+
+        # orders with further stations wait in front of their next one from the next iteration on
+        finished = visits + 1 == self.orders["plan_length"][replicas, slots]
+        rows, slots_left, next_visits = replicas[~finished], slots[~finished], visits[~finished] + 1
+        next_stations = self.visits["station_id"][rows, slots_left, next_visits]
+        self.orders["state"][rows, slots_left] = QUEUED
+        self.orders["next_station"][rows, slots_left] = next_stations
+        self.orders["ready_time"][rows, slots_left] = self.simTime + 1
+        self.queueLengths += np.bincount(rows * self.queueLengths.shape[1] + next_stations,
+                                         minlength=self.queueLengths.size).reshape(self.queueLengths.shape)
+
+        # finished orders are recorded and release their slot
+        for replica, slot in zip(replicas[finished].tolist(), slots[finished].tolist()):
+            self.recordOrder(replica, slot)
+        self.orders["state"][replicas[finished], slots[finished]] = FREE
+        self.existingOrders -= np.bincount(replicas[finished], minlength=self.nReplicas)
+        return
+
+    def recordOrder(self, replica, slot):
+        # record all station visits of a finished order in the event recorder of its replica
+        recorder = self.eventRecorders[replica]
+        n_visits = self.orders["plan_length"][replica, slot]
+        recorder.reserve(n_visits)
+        rows = slice(recorder.size, recorder.size + n_visits)
+
+        recorder.buffers["order_id"][rows] = self.orders["order_id"][replica, slot]
+        recorder.buffers["init_time"][rows] = self.orders["init_time"][replica, slot]
+        for column in self.visits:
+            recorder.buffers[column][rows] = self.visits[column][replica, slot, :n_visits]
+        recorder.size += n_visits
+        return
+
+    def segmentOf(self, sim_times):
+        # maintenance interval of simulation times, the performance is reset after every iteration
+        # that is a multiple of the maintenance interval, so iteration 0 is an interval of its own
+        return np.where(sim_times > 0, (sim_times - 1) // self.maintenanceInterval + 1, 0)
+
+    def segmentStart(self, segments):
+        return np.where(segments > 0, (segments - 1) * self.maintenanceInterval + 1, 0)
+
+    def segmentIntegral(self, work_before, n_steps):
+        # sum of the linearly degrading performances over n_steps working iterations
+        # after work_before working iterations since the last maintenance, bounded below by zero
+        start_performances = np.maximum(1 - self.degradationRate * work_before, 0)
+        if self.degradationRate == 0:
+            return n_steps * start_performances
+        positive_steps = np.minimum(n_steps, np.ceil(start_performances / self.degradationRate))
+        return positive_steps * start_performances - self.degradationRate * positive_steps * (positive_steps - 1) / 2
+
+    def startWork(self, replicas, stations):
+        # returns the performance of the stations when they start working on an order
+        same_segment = self.stationSegment[replicas, stations] == self.segmentOf(self.simTime)
+        work_before = np.where(same_segment, self.stationSegmentWork[replicas, stations], 0)
+        self.stationWorkBefore[replicas, stations] = work_before
+        return np.maximum(1 - self.degradationRate * work_before, 0)
+
+    def finishWork(self, replicas, stations, work_starts):
+        # returns the mean performances of the stations while working on their orders until this iteration
+        work_before = self.stationWorkBefore[replicas, stations]
+        start_segments = self.segmentOf(work_starts)
+        end_segments = self.segmentOf(self.simTime)
+        crossing = end_segments > start_segments
+
+        # the working iterations are split at the maintenance resets, intervals in between start at full performance
+        first_ends = np.minimum(self.simTime, self.segmentStart(start_segments + 1))
+        last_starts = self.segmentStart(end_segments)
+        integrals = self.segmentIntegral(work_before, first_ends - work_starts)
+        if crossing.any():
+            integrals += np.where(crossing,
+                                  (end_segments - start_segments - 1) * self.segmentIntegral(0, self.maintenanceInterval) +
+                                  self.segmentIntegral(0, self.simTime - last_starts),
+                                  0)
+        work_lengths = self.simTime - work_starts
+        mean_performances = np.where(work_lengths > 0, integrals / np.maximum(work_lengths, 1),
+                                     np.maximum(1 - self.degradationRate * work_before, 0))
+
+        # the station is still degrading in the iteration it finishes the order
+        self.stationSegment[replicas, stations] = end_segments
+        self.stationSegmentWork[replicas, stations] = np.where(crossing, self.simTime - last_starts,
+                                                               work_before + work_lengths) + 1
+        return mean_performances
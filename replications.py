@@ -0,0 +1,211 @@
+# This is a runner for independent Monte Carlo replications of one configuration
+# Every replication simulates the same enterprise with its own seed derived from the seed of the run and is
+# reduced to summary KPIs, i.e. throughput, cycle time per station, utilisation and work in progress (WIP)
+# The KPIs of all replications are aggregated to means with confidence intervals, optionally further
+# replications are added in rounds until the confidence intervals are narrow enough
+# Small configs can be replicated in lockstep instead, i.e. all replications are simulated together in one process
+# with vectorized steps (ReplicaBatch), which also exports their event logs with a replica id
+#
+# usage: python replications.py CONFIG [--replications R] [--max-replications N] [--half-width H]
+#                               [--confidence C] [--workers N] [--seed SEED] [--export DIR] [--lockstep]
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import configfile
+import main
+from logstream import EXPORT_EXTENSIONS
+from replicabatch import ReplicaBatch
+from runningstatistics import t_quantile
+
+DEFAULT_MAX_REPLICATIONS = 1000  # cap of the replications added for a half width target if no cap is given
+
+
+def replication_seed(base_seed, replication_index):
+    # independent seed for every replication derived from the seed of the run
+    seed_sequence = np.random.SeedSequence(base_seed, spawn_key=(replication_index,))
+    return int(seed_sequence.generate_state(1, np.uint64)[0])
+
+
+def replication_kpis(sim_env):
+    # summary KPIs of a simulated enterprise
+    return visit_kpis(sim_env.eventRecorder, sim_env.stations, sim_env.timeManager.simDuration,
+                      wip=sim_env.existingOrders.timeAverage(),
+                      station_utilisation=1 - sim_env.stationsAvailable.timeAverage() / len(sim_env.stations),
+                      resource_utilisation=1 - sim_env.resourcesAvailable.timeAverage() / len(sim_env.resources))
+
+
+def lockstep_replication_kpis(replica_batch, replica):
+    # summary KPIs of a replica simulated in lockstep, the enterprise variables are its time integrals
+    return visit_kpis(replica_batch.eventRecorders[replica], replica_batch.enterprise.stations,
+                      replica_batch.simDuration,
+                      wip=replica_batch.wipIntegral[replica] / replica_batch.simDuration,
+                      station_utilisation=replica_batch.busyStationIntegral[replica] /
+                      (replica_batch.simDuration * len(replica_batch.enterprise.stations)),
+                      resource_utilisation=replica_batch.busyResourceIntegral[replica] /
+                      (replica_batch.simDuration * len(replica_batch.enterprise.resources)))
+
+
+def visit_kpis(recorder, stations, sim_duration, wip, station_utilisation, resource_utilisation):
+    # throughput and cycle times from the recorded visits next to the time-averaged enterprise variables
+    sim_days = sim_duration / (60 * 60 * 24)
+
+    # time an order spends per station visit, i.e. waiting in front of and at the station and being worked
+    station_ids = recorder.column("station_id")
+    cycle_times = recorder.column("waiting_time") + recorder.column("waiting_time_at_station") + recorder.column("duration")
+    visits = np.bincount(station_ids, minlength=len(stations))
+    cycle_time_sums = np.bincount(station_ids, weights=cycle_times, minlength=len(stations))
+
+    kpis = {"throughput": len(np.unique(recorder.column("order_id"))) / sim_days,  # completed orders per day
+            "wip": wip,
+            "station_utilisation": station_utilisation,
+            "resource_utilisation": resource_utilisation,
+            "cycle_time": cycle_times.mean() if len(cycle_times) > 0 else np.nan}
+
+    # stations without completed visits have no cycle time in this replication
+    for station, n_visits, cycle_time_sum in zip(stations, visits, cycle_time_sums):
+        kpis["cycle_time_station_" + str(station.stationName)] = cycle_time_sum / n_visits if n_visits > 0 else np.nan
+    return kpis
+
+
+def run_replication(params, seed):
+    params = dict(params, SEED=seed)
+    main.set_default_params(params)
+
+    sim_enterprise = main.build_enterprise(params)
+    main.simulate(sim_enterprise, mode=params["SIM_MODE"])
+    return replication_kpis(sim_enterprise)
+
+
+def summarize_replications(samples, confidence=0.95):
+    # mean and confidence interval of every KPI over the replications it is defined in
+    summary = []
+    for kpi in samples.columns:
+        values = samples[kpi].dropna().to_numpy()
+        n = len(values)
+        mean = values.mean() if n > 0 else np.nan
+        std = values.std(ddof=1) if n > 1 else np.nan
+        half_width = t_quantile(0.5 + confidence / 2, n - 1) * std / np.sqrt(n) if n > 1 else np.nan
+        summary.append({"kpi": kpi,
+                        "replications": n,
+                        "mean": mean,
+                        "std": std,
+                        "half_width": half_width,
+                        "lower": mean - half_width,
+                        "upper": mean + half_width})
+    return pd.DataFrame(summary)
+
+
+def precise_enough(summary, target_half_width, target_kpis=None):
+    # are the half widths of all target KPIs at most target_half_width relative to their means?
+    if target_kpis is not None:
+        summary = summary[summary["kpi"].isin(target_kpis)]
+    # KPIs that are constantly zero or not defined in enough replications cannot be narrowed down
+    summary = summary[summary["mean"] != 0]
+    return bool((summary["half_width"] <= target_half_width * summary["mean"].abs()).all())
+
+
+def run_replications(params, replications=10, max_replications=None, target_half_width=None, target_kpis=None,
+                     confidence=0.95, workers=None, base_seed=None):
+    # returns the KPI summary and the KPIs of every replication
+
+    # the seed of the run is reported so that unseeded runs can be repeated
+    if base_seed is None:
+        base_seed = np.random.SeedSequence().entropy
+    print("Replication seed: " + str(base_seed))
+
+    workers = workers if workers is not None else os.cpu_count()
+    # without a half width target the initial replications are all there is,
+    # with a target replications are added until it is met or the cap is reached
+    if target_half_width is None:
+        max_replications = replications
+    elif max_replications is None:
+        max_replications = max(replications, DEFAULT_MAX_REPLICATIONS)
+
+    samples = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        round_size = replications
+        while True:
+            # the replication index continues over the rounds, so every replication keeps its seed
+            seeds = [replication_seed(base_seed, replication_index)
+                     for replication_index in range(len(samples), len(samples) + round_size)]
+            samples.extend(executor.map(run_replication, [params] * len(seeds), seeds))
+            print("Finished " + str(len(samples)) + " replications")
+
+            summary = summarize_replications(pd.DataFrame(samples), confidence)
+            if target_half_width is None or precise_enough(summary, target_half_width, target_kpis):
+                break
+            if len(samples) >= max_replications:
+                print("Warning: stopped at the maximum of " + str(max_replications) + " replications, "
+                      "the confidence intervals are still wider than the half width target")
+                break
+
+            # further replications are added one worker pool at a time
+            round_size = min(workers, max_replications - len(samples))
+
+    print("Replications completed!")
+    return summary, pd.DataFrame(samples)
+
+
+def run_lockstep_replications(params, replications=10, confidence=0.95, base_seed=None):
+    # returns the KPI summary, the KPIs of every replication and the replicas simulated in lockstep
+    # (only for the expected degradation mode, the number of replications is fixed)
+    if base_seed is None:
+        base_seed = np.random.SeedSequence().entropy
+    print("Replication seed: " + str(base_seed))
+
+    params = dict(params, SEED=base_seed)
+    main.set_default_params(params)
+    replica_batch = ReplicaBatch("ReplicaBatch", main.build_enterprise(params), replications, base_seed)
+    replica_batch.simulate()
+
+    samples = pd.DataFrame([lockstep_replication_kpis(replica_batch, replica) for replica in range(0, replications)])
+    print("Replications completed!")
+    return summarize_replications(samples, confidence), samples, replica_batch
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Simulate independent replications of a config")
+    parser.add_argument("config", help="config file")
+    parser.add_argument("--replications", type=int, default=10, help="number of replications to start with")
+    parser.add_argument("--max-replications", type=int, default=None,
+                        help="maximum number of replications for a half width target (default: " +
+                             str(DEFAULT_MAX_REPLICATIONS) + ")")
+    parser.add_argument("--half-width", type=float, default=None,
+                        help="add replications until all confidence intervals are at most this wide relative to the mean")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the intervals")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the replications")
+    parser.add_argument("--export", default="export/", help="directory the KPIs are written to")
+    parser.add_argument("--lockstep", action="store_true",
+                        help="simulate all replications in lockstep in this process and export their event logs")
+    args = parser.parse_args()
+    if args.lockstep and args.half_width is not None:
+        parser.error("--half-width needs replications in rounds, it cannot be combined with --lockstep")
+
+    params = configfile.load_config(args.config)
+
+    config_name = os.path.splitext(os.path.basename(args.config))[0]
+    export_path = os.path.join(args.export, config_name)
+    os.makedirs(export_path, exist_ok=True)
+
+    if args.lockstep:
+        summary, samples, replica_batch = run_lockstep_replications(params, args.replications, args.confidence,
+                                                                    args.seed)
+        output_format = params.get("OUTPUT_FORMAT", "csv")
+        main.export_event_log(main.generate_replica_event_log(replica_batch),
+                              os.path.join(export_path, "replica_event_log_" + config_name +
+                                           EXPORT_EXTENSIONS[output_format]),
+                              output_format)
+    else:
+        summary, samples = run_replications(params, args.replications, args.max_replications, args.half_width,
+                                            confidence=args.confidence, workers=args.workers, base_seed=args.seed)
+    print(summary.to_string(index=False))
+
+    summary.to_csv(os.path.join(export_path, "replication_summary_" + config_name + ".csv"), index=False)
+    samples.to_csv(os.path.join(export_path, "replications_" + config_name + ".csv"), index=False)
@@ -1,10 +1,15 @@
 # This class represents a resource (worker) that executes tasks at a station
 
+import changelog
+
+
 class Resource:
 
-    def __init__(self, resource_name, resource_productivity):
+    def __init__(self, resource_name, resource_productivity, resource_id=None):
+        self.resourceId = resource_id  # index of the resource in the enterprise
         self.resourceName = resource_name
         self.resourceProductivity = resource_productivity
 
         self.available = True
-        self.availabilityLog = []
+        self.availabilityLog = changelog.ChangeLog("availabilityLog", bool)  # availability over simulation time
+        self.availabilityLog.record(0, True)
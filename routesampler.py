@@ -0,0 +1,119 @@
+# This class samples the station plans (routes) of new orders from the station transition probabilities
+# Every row of the transition matrix is turned into an alias table over its non-zero transitions once (per matrix),
+# so every hop of a route costs one uniform random number regardless of the number of stations
+# Routes are sampled in blocks with one vectorized pass per hop and handed out one by one
+
+import numpy as np
+
+from transitionmatrix import TransitionMatrix
+
+
+class RouteSampler:
+
+    def __init__(self, sampler_name, station_probs, random_streams, block_size=1024):
+
+        self.samplerName = sampler_name
+        self.randomStreams = random_streams
+        self.blockSize = block_size
+
+        # nested lists or arrays are compressed, alias tables that were already built for a matrix are reused
+        if not isinstance(station_probs, TransitionMatrix):
+            station_probs = TransitionMatrix.fromDense("TransitionMatrix", station_probs)
+        if station_probs.aliasTables is None:
+            station_probs.aliasTables = self.buildAliasTables(station_probs)
+
+        self.nStations = station_probs.nStations
+        self.finalStation = self.nStations - 1  # routes end when this station is reached
+        self.widths = station_probs.aliasTables["widths"]
+        self.outcomes = station_probs.aliasTables["outcomes"]
+        self.thresholds = station_probs.aliasTables["thresholds"]
+        self.aliases = station_probs.aliasTables["aliases"]
+
+        self.routes = []  # block of pre-sampled routes
+        self.position = 0
+
+    @staticmethod
+    def buildAliasTables(station_probs):
+        # alias tables of all stations of a TransitionMatrix, padded to the maximum number of transitions of a row
+        n_stations = station_probs.nStations
+        max_width = max(1, int(np.diff(station_probs.rowPointers).max()))
+        alias_tables = {"widths": np.zeros(n_stations, dtype=np.int64),
+                        "outcomes": np.zeros((n_stations, max_width), dtype=np.int64),
+                        "thresholds": np.ones((n_stations, max_width)),
+                        "aliases": np.zeros((n_stations, max_width), dtype=np.int64)}
+
+        for row in range(0, n_stations):
+            targets, probs = station_probs.transitions(row)
+            if len(targets) == 0:
+                if row != n_stations - 1:
+                    raise ValueError("station " + str(row) + " has no outgoing transitions")
+                continue
+
+            thresholds, aliases = RouteSampler.buildAliasTable(probs)
+            alias_tables["widths"][row] = len(targets)
+            alias_tables["outcomes"][row, :len(targets)] = targets
+            alias_tables["thresholds"][row, :len(targets)] = thresholds
+            alias_tables["aliases"][row, :len(targets)] = aliases
+        return alias_tables
+
+    @staticmethod
+    def buildAliasTable(probs):
+        # Vose's alias method: every column keeps its own outcome with probability threshold
+        # and hands over to its alias outcome otherwise
+        width = len(probs)
+        scaled = list(probs / probs.sum() * width)
+        thresholds = [1.0] * width
+        aliases = list(range(0, width))
+
+        small = [i for i in range(0, width) if scaled[i] < 1]
+        large = [i for i in range(0, width) if scaled[i] >= 1]
+        while len(small) > 0 and len(large) > 0:
+            less = small.pop()
+            more = large.pop()
+            thresholds[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # remaining columns are full up to floating point errors
+        return thresholds, aliases
+
+    def sampleHops(self, current_stations):
+        # sample the next station for every entry of current_stations with one uniform number each
+        scaled = self.randomStreams.generator("routing").random(len(current_stations)) * self.widths[current_stations]
+        columns = np.minimum(scaled.astype(np.int64), self.widths[current_stations] - 1)
+        keep = (scaled - columns) < self.thresholds[current_stations, columns]
+        columns = np.where(keep, columns, self.aliases[current_stations, columns])
+        return self.outcomes[current_stations, columns]
+
+    def sampleRoutes(self, k):
+        # sample k routes starting at the first station until the final station is reached
+        routes = [[0] for i in range(0, k)]
+        active = np.arange(0, k)
+        current_stations = np.zeros(k, dtype=np.int64)
+        if self.finalStation == 0:
+            return routes
+
+        while len(active) > 0:
+            current_stations = self.sampleHops(current_stations)
+            for route, station in zip(active.tolist(), current_stations.tolist()):
+                routes[route].append(station)
+
+            unfinished = current_stations != self.finalStation
+            active = active[unfinished]
+            current_stations = current_stations[unfinished]
+
+        return routes
+
+    def nextRoute(self):
+        if self.position == len(self.routes):
+            self.routes = self.sampleRoutes(self.blockSize)
+            self.position = 0
+
+        route = self.routes[self.position]
+        self.routes[self.position] = None
+        self.position += 1
+        return route
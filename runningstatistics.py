@@ -0,0 +1,128 @@
+# This class summarizes a stream of values without keeping them
+# Mean and variance are updated with Welford's algorithm, quantiles are estimated with the P² algorithm
+# (Jain and Chlamtac, 1985) that tracks five markers per quantile, so memory is constant in the number of values
+
+import math
+from statistics import NormalDist
+
+
+def t_quantile(probability, degrees_of_freedom):
+    # quantile of the Student t distribution from the normal quantile by the Cornish-Fisher expansion,
+    # accurate to a few decimals from four degrees of freedom on
+    z = NormalDist().inv_cdf(probability)
+    v = degrees_of_freedom
+    return (z + (z**3 + z) / (4 * v)
+            + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2)
+            + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3)
+            + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * v**4))
+
+
+class RunningStatistics:
+
+    def __init__(self, statistics_name, quantiles=(0.5, 0.9, 0.95, 0.99)):
+
+        self.statisticsName = statistics_name
+        self.quantiles = quantiles
+
+        self.count = 0
+        self.mean = 0.0
+        self.sumSquaredDeviations = 0.0  # sum of squared deviations from the mean (M2)
+        self.min = math.inf
+        self.max = -math.inf
+
+        # P² markers per quantile, i.e. marker heights, actual and desired marker positions and the increments of
+        # the desired positions, the first five values are kept as they are to initialize the markers
+        self.firstValues = []
+        self.heights = {}
+        self.positions = {}
+        self.desiredPositions = {}
+        self.increments = {quantile: (0, quantile / 2, quantile, (1 + quantile) / 2, 1) for quantile in quantiles}
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sumSquaredDeviations += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if self.count <= 5:
+            self.firstValues.append(value)
+            if self.count == 5:
+                for quantile in self.quantiles:
+                    self.heights[quantile] = sorted(self.firstValues)
+                    self.positions[quantile] = [1, 2, 3, 4, 5]
+                    self.desiredPositions[quantile] = [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+            return
+
+        for quantile in self.quantiles:
+            self.updateMarkers(quantile, value)
+        return
+
+    def updateMarkers(self, quantile, value):
+        heights = self.heights[quantile]
+        positions = self.positions[quantile]
+        desired_positions = self.desiredPositions[quantile]
+
+        # cell of the value between the markers, the outer markers track minimum and maximum
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+
+        for marker in range(cell + 1, 5):
+            positions[marker] += 1
+        for marker, increment in enumerate(self.increments[quantile]):
+            desired_positions[marker] += increment
+
+        # move the inner markers one position towards their desired position if they are off by one or more
+        for marker in (1, 2, 3):
+            offset = desired_positions[marker] - positions[marker]
+            if (offset >= 1 and positions[marker + 1] - positions[marker] > 1) or \
+                    (offset <= -1 and positions[marker - 1] - positions[marker] < -1):
+                step = 1 if offset > 0 else -1
+
+                # piecewise parabolic prediction of the new height, linear if that leaves the neighbouring heights
+                height = heights[marker] + step / (positions[marker + 1] - positions[marker - 1]) * (
+                    (positions[marker] - positions[marker - 1] + step) * (heights[marker + 1] - heights[marker]) /
+                    (positions[marker + 1] - positions[marker]) +
+                    (positions[marker + 1] - positions[marker] - step) * (heights[marker] - heights[marker - 1]) /
+                    (positions[marker] - positions[marker - 1]))
+                if not heights[marker - 1] < height < heights[marker + 1]:
+                    height = heights[marker] + step * (heights[marker + step] - heights[marker]) / \
+                        (positions[marker + step] - positions[marker])
+
+                heights[marker] = height
+                positions[marker] += step
+        return
+
+    def variance(self):
+        return self.sumSquaredDeviations / (self.count - 1) if self.count > 1 else math.nan
+
+    def quantile(self, quantile):
+        if self.count == 0:
+            return math.nan
+        if self.count < 5:
+            # exact quantile of the few values seen so far (linear interpolation)
+            values = sorted(self.firstValues)
+            position = quantile * (len(values) - 1)
+            lower = math.floor(position)
+            upper = min(lower + 1, len(values) - 1)
+            return values[lower] + (position - lower) * (values[upper] - values[lower])
+        return self.heights[quantile][2]
+
+    def summary(self):
+        summary = {"count": self.count,
+                   "mean": self.mean if self.count > 0 else math.nan,
+                   "std": math.sqrt(self.variance()) if self.count > 1 else math.nan,
+                   "min": self.min if self.count > 0 else math.nan,
+                   "max": self.max if self.count > 0 else math.nan}
+        for quantile in self.quantiles:
+            summary["p" + str(round(quantile * 100, 1)).rstrip("0").rstrip(".")] = self.quantile(quantile)
+        return summary
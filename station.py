@@ -1,14 +1,26 @@
 # This class represents a process station/activity
 
+import changelog
+
+
 class Station:
 
-    def __init__(self, station_name, execution_prob, duration_baseline):
+    def __init__(self, station_name, execution_prob, duration_baseline, station_id=None):
 
+        self.stationId = station_id  # index of the station in the enterprise
         self.stationName = station_name
         self.executionProb = execution_prob
         self.durationBaseline = duration_baseline
 
         self.performance = 1
         self.available = True
-        self.availabilityLog = []
-        self.performanceLog = []
+        self.availabilityLog = changelog.ChangeLog("availabilityLog", bool)  # availability over simulation time
+        self.availabilityLog.record(0, True)
+        self.waitingQueue = []  # priority queue of idle orders that have this station as their next station
+        self.performanceLog = []  # performance per iteration, only recorded for sampled degradation
+
+        # closed form degradation bookkeeping, see DegradationModel
+        self.working = False
+        self.performanceTime = 0  # iteration the current performance refers to
+        self.performanceIntegral = 0  # summed performance of all iterations before performanceTime
+        self.workStartIntegral = 0  # performance integral when the station started working on its current order
@@ -0,0 +1,122 @@
+# This class detects when a simulation has reached its steady state and when enough of it was simulated
+# The work in progress (WIP) and the cycle time of finished orders are averaged over batches of simulation time,
+# the warm-up period is truncated where the marginal standard error (MSER) of the remaining batch means is minimal
+# Once a warm-up was found, the batch means after it are steady-state observations, the run can be stopped
+# when a requested number of them was collected or their confidence intervals are narrow enough
+# Batches should be long enough for their means to be roughly independent, e.g. several order cycle times
+
+import math
+
+import numpy as np
+
+from runningstatistics import t_quantile
+
+
+class SteadyStateDetector:
+
+    def __init__(self, detector_name, batch_length=60*60, min_batches=10, steady_batches=None, precision=None,
+                 confidence=0.95):
+
+        self.detectorName = detector_name
+        self.batchLength = batch_length  # simulation times per batch
+        self.minBatches = min_batches  # batches before the warm-up is first looked for
+        self.steadyBatches = steady_batches  # stop after this many steady-state batches (None for no limit)
+        self.precision = precision  # stop when all confidence intervals are at most this wide relative to their means
+        self.confidence = confidence
+
+        self.batchStart = 0  # simulation time the current batch started at
+        self.cycleTimeSum = 0  # summed cycle times of the orders finished in the current batch
+        self.finishedOrders = 0
+
+        self.wipMeans = []  # time-averaged WIP per batch
+        self.cycleTimeMeans = []  # mean cycle time of the orders finished in each batch (nan if none)
+        self.warmUpBatches = None  # batches of the warm-up once the steady state was reached
+        self.stopReason = None
+
+    def recordOrder(self, order):
+        # add the cycle time of a finished order to the current batch
+        self.cycleTimeSum += sum(order.waitingTimeLog) + sum(order.waitingTimeAtStationLog) + sum(order.durationLog)
+        self.finishedOrders += 1
+        return
+
+    def nextBatchTime(self):
+        return self.batchStart + self.batchLength
+
+    def closeBatches(self, existing_orders, sim_time):
+        # close all batches that ended before sim_time
+        while self.nextBatchTime() <= sim_time:
+            self.wipMeans.append(existing_orders.timeAverage(self.batchStart, self.nextBatchTime()))
+            self.cycleTimeMeans.append(self.cycleTimeSum / self.finishedOrders if self.finishedOrders > 0 else math.nan)
+            self.cycleTimeSum = 0
+            self.finishedOrders = 0
+            self.batchStart = self.nextBatchTime()
+        return
+
+    @staticmethod
+    def truncationPoint(batch_means):
+        # number of leading batches to drop so that the MSER of the remaining ones is minimal,
+        # only the first half is considered and None is returned if the minimum lies at its end (not steady yet)
+        valid_batches = np.flatnonzero(~np.isnan(batch_means))
+        values = np.asarray(batch_means)[valid_batches]
+        n = len(values)
+        if n < 2:
+            return None
+
+        # sums of the values and their squares from every batch to the end
+        remaining = np.arange(n, 0, -1)
+        value_sums = np.cumsum(values[::-1])[::-1]
+        squared_sums = np.cumsum(values[::-1] ** 2)[::-1]
+        mser = (squared_sums - value_sums ** 2 / remaining) / remaining ** 2
+
+        candidates = n // 2
+        truncation = int(np.argmin(mser[:candidates + 1]))
+        if truncation == candidates:
+            return None
+        return int(valid_batches[truncation])
+
+    def relativeHalfWidth(self, batch_means):
+        # half width of the confidence interval of the steady-state mean relative to it
+        values = np.asarray(batch_means[self.warmUpBatches:])
+        values = values[~np.isnan(values)]
+        if len(values) < 2 or values.mean() == 0:
+            return math.inf
+        half_width = t_quantile(0.5 + self.confidence / 2, len(values) - 1) * values.std(ddof=1) / math.sqrt(len(values))
+        return half_width / abs(values.mean())
+
+    def update(self, existing_orders, sim_time):
+        # close finished batches, look for the end of the warm-up and decide whether the run can stop
+        self.closeBatches(existing_orders, sim_time)
+        if len(self.wipMeans) < self.minBatches:
+            return False
+
+        wip_truncation = self.truncationPoint(self.wipMeans)
+        cycle_time_truncation = self.truncationPoint(self.cycleTimeMeans)
+        if wip_truncation is None or cycle_time_truncation is None:
+            self.warmUpBatches = None
+            return False
+        self.warmUpBatches = max(wip_truncation, cycle_time_truncation)
+
+        if self.steadyBatches is not None and len(self.wipMeans) - self.warmUpBatches >= self.steadyBatches:
+            self.stopReason = "steady batches"
+            return True
+        if self.precision is not None and max(self.relativeHalfWidth(self.wipMeans),
+                                              self.relativeHalfWidth(self.cycleTimeMeans)) <= self.precision:
+            self.stopReason = "precision"
+            return True
+        return False
+
+    def warmUpEnd(self):
+        # simulation time the steady state starts at, None if it was not reached
+        return self.warmUpBatches * self.batchLength if self.warmUpBatches is not None else None
+
+    def report(self):
+        return {"batch_length": self.batchLength,
+                "batches": len(self.wipMeans),
+                "warm_up_batches": self.warmUpBatches,
+                "warm_up_end": self.warmUpEnd(),
+                "stop_reason": self.stopReason,
+                "wip_relative_half_width": self.relativeHalfWidth(self.wipMeans) if self.warmUpBatches is not None else None,
+                "cycle_time_relative_half_width":
+                    self.relativeHalfWidth(self.cycleTimeMeans) if self.warmUpBatches is not None else None,
+                "wip_means": self.wipMeans,
+                "cycle_time_means": [None if math.isnan(mean) else mean for mean in self.cycleTimeMeans]}
@@ -0,0 +1,97 @@
+# This is a runner for simulating many configurations in parallel
+# Configs are distributed over a pool of worker processes, the most expensive ones are started first
+# so that long runs do not end up as stragglers, and configs that already have all their outputs are skipped
+#
+# usage: python sweep.py [--workers N] [--seed SEED] [--configs DIR] [--export DIR]
+
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import configfile
+import main
+
+
+def config_cost(params):
+    # the work of a run grows with the number of stations and the simulated duration
+    return params["STATION_COUNT"] * params["SIM_DURATION"]
+
+
+def config_seed(base_seed, config_file):
+    # independent seed for every config derived from the seed of the sweep and the name of the config
+    # (not its position in the config directory, so adding or removing configs keeps the seeds of all others
+    # and resumed sweeps use the same seeds, a json and an npz file of the same config share their seed)
+    config_name = os.path.splitext(os.path.basename(config_file))[0]
+    name_hash = hashlib.sha256(config_name.encode("utf-8")).digest()
+    spawn_key = tuple(int.from_bytes(name_hash[i:i + 4], "little") for i in range(0, len(name_hash), 4))
+    seed_sequence = np.random.SeedSequence(base_seed, spawn_key=spawn_key)
+    return int(seed_sequence.generate_state(1, np.uint64)[0])
+
+
+def config_done(params, config_file, export_dir):
+    output_format = params.get("OUTPUT_FORMAT", "csv")
+    online_metrics = params.get("ONLINE_METRICS", False)
+    return all(os.path.exists(filename)
+               for filename in main.export_filenames(export_dir, config_file, output_format, online_metrics))
+
+
+def plan_sweep(config_dir, export_dir, base_seed):
+    # list of (cost, config file, seed) for all configs without outputs, most expensive first
+    jobs = []
+    for config_file in configfile.config_files(config_dir):
+        # the transitions are only prepared by the worker that simulates the config
+        params = configfile.load_config(os.path.join(config_dir, config_file), cache=False)
+
+        if config_done(params, config_file, export_dir):
+            print("Skipping " + config_file + ", outputs exist")
+            continue
+
+        jobs.append((config_cost(params), config_file, config_seed(base_seed, config_file)))
+
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    return jobs
+
+
+def run_job(config_file, seed, config_dir, export_dir):
+    start_time = time.time()
+    main.run_config(config_file, seed=seed, config_dir=config_dir, export_dir=export_dir)
+    return config_file, time.time() - start_time
+
+
+def run_sweep(config_dir="configs/", export_dir="export/", workers=None, base_seed=None):
+
+    # the seed of the sweep is reported so that unseeded sweeps can be repeated
+    if base_seed is None:
+        base_seed = np.random.SeedSequence().entropy
+    print("Sweep seed: " + str(base_seed))
+
+    jobs = plan_sweep(config_dir, export_dir, base_seed)
+    print("Running " + str(len(jobs)) + " configs...")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, config_file, seed, config_dir, export_dir): config_file
+                   for cost, config_file, seed in jobs}
+
+        for finished, future in enumerate(as_completed(futures), start=1):
+            config_file, runtime = future.result()
+            print("Finished " + config_file + " in " + str(round(runtime)) + "s (" +
+                  str(finished) + "/" + str(len(jobs)) + ")")
+
+    print("Sweep completed!")
+    return
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Simulate all configs in parallel")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the sweep")
+    parser.add_argument("--configs", default="configs/", help="directory of the config files")
+    parser.add_argument("--export", default="export/", help="directory the outputs are written to")
+    args = parser.parse_args()
+
+    run_sweep(args.configs, args.export, args.workers, args.seed)
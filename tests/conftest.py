@@ -0,0 +1,6 @@
+# The simulation modules live in the repository root, which is put on the path for the tests
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,28 @@
+# Tests of the background export queue, failures of jobs are raised when the queue is closed,
+# but must not replace an exception that ends the block of the queue
+
+import pytest
+
+from exportqueue import ExportQueue
+
+
+def failing_job():
+    raise OSError("disk full")
+
+
+def test_job_failure_is_raised_on_exit():
+    with pytest.raises(OSError):
+        with ExportQueue("ExportQueue") as export_queue:
+            export_queue.submit(failing_job)
+
+
+def test_exception_in_block_is_kept_and_jobs_are_written(capsys):
+    written = []
+    with pytest.raises(KeyboardInterrupt):
+        with ExportQueue("ExportQueue", n_writers=2) as export_queue:
+            export_queue.submit(written.append, "log")
+            # the failure can only surface when the queue is left, no later submit raises it
+            export_queue.submit(failing_job)
+            raise KeyboardInterrupt
+    assert written == ["log"]
+    assert "disk full" in capsys.readouterr().out
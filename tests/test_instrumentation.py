@@ -0,0 +1,25 @@
+# Tests of the profile window of the instrumentation, which has to be opened at the first simulation step
+# in it even if no sampled step falls into it, and reported as missed if no step falls into it at all
+
+import main
+from instrumentation import Instrumentation
+from test_simulation import config_params
+
+
+def profiled_report(mode, profile_window, sim_duration=150000):
+    sim_enterprise = main.build_enterprise(config_params(SIM_DURATION=sim_duration))
+    sim_instrumentation = Instrumentation("Instrumentation", progress_callback=None, profile_window=profile_window)
+    main.simulate(sim_enterprise, mode=mode, instrumentation=sim_instrumentation)
+    return sim_instrumentation.report()
+
+
+def test_profile_window_between_sampled_steps_is_profiled():
+    # event mode runs far fewer steps than sampleInterval in this window
+    report = profiled_report("event", (1000, 5000))
+    assert len(report["profile"]["functions"]) > 0
+
+
+def test_profile_window_without_steps_is_reported_as_missed(capsys):
+    report = profiled_report("event", (200000, 300000))
+    assert report["profile"] == {"window": [200000, 300000], "missed": True}
+    assert "Warning" in capsys.readouterr().out
@@ -0,0 +1,35 @@
+# Tests of the KPIs aggregated while simulating, a run with online metrics takes the same course as a logged run
+# from the same seed, so its utilisations and work in progress have to match the ones of the logs
+
+import pytest
+
+import main
+from test_simulation import config_params
+
+
+@pytest.mark.parametrize("mode", ["tick", "event"])
+def test_online_metrics_match_the_logs(mode):
+    params = config_params()
+    logged_enterprise = main.build_enterprise(params)
+    main.simulate(logged_enterprise, mode=mode)
+    online_enterprise = main.build_enterprise(params)
+    # a period that does not divide the simulation duration, so the last period is shorter
+    main.aggregate_online_metrics(online_enterprise, wip_period=7000)
+    main.simulate(online_enterprise, mode=mode)
+    summary = online_enterprise.onlineMetrics.summary(online_enterprise)
+
+    assert summary["station_utilisation"] == pytest.approx(
+        1 - logged_enterprise.stationsAvailable.timeAverage() / len(logged_enterprise.stations))
+    assert summary["resource_utilisation"] == pytest.approx(
+        1 - logged_enterprise.resourcesAvailable.timeAverage() / len(logged_enterprise.resources))
+    for station, station_summary in zip(logged_enterprise.stations, summary["stations"]):
+        assert station_summary["utilisation"] == pytest.approx(1 - station.availabilityLog.timeAverage())
+    for resource, resource_summary in zip(logged_enterprise.resources, summary["resources"]):
+        assert resource_summary["utilisation"] == pytest.approx(1 - resource.availabilityLog.timeAverage())
+
+    # the work in progress is integrated by the online metrics instead of being logged
+    assert len(online_enterprise.existingOrders) == 0
+    assert summary["wip"]["mean"] == pytest.approx(logged_enterprise.existingOrders.timeAverage())
+    assert summary["wip"]["max"] == logged_enterprise.existingOrders.maxValue()
+    assert summary["wip"]["period_means"] == pytest.approx(
+        logged_enterprise.existingOrders.periodAverages(7000).tolist())
@@ -0,0 +1,81 @@
+# Seeded regression tests of the simulation engines, checkpoints and config formats
+# The tick and the event engine, resumed runs and runs from json or npz configs have to generate identical logs
+
+import os
+
+import pandas as pd
+import pytest
+
+import configfile
+import main
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configs")
+SIM_DURATION = 30000
+
+
+def config_params(config_file="initial.json", **overrides):
+    # a small seeded config with a higher order frequency, so stations and resources are contended
+    params = configfile.load_config(os.path.join(CONFIG_DIR, config_file), cache=False)
+    params.update({"SIM_DURATION": SIM_DURATION, "ORDER_FREQUENCY": 0.01, "SEED": 7}, **overrides)
+    return main.set_default_params(params)
+
+
+def simulated_logs(sim_enterprise, sim_duration=SIM_DURATION):
+    event_log = main.generate_event_log(sim_enterprise)
+    enterprise_log = main.generate_enterprise_log(sim_enterprise, main.generate_event_times(event_log, sim_duration))
+    return event_log, enterprise_log
+
+
+def simulate_params(params, mode, **simulate_args):
+    sim_enterprise = main.build_enterprise(params)
+    main.simulate(sim_enterprise, mode=mode, **simulate_args)
+    return simulated_logs(sim_enterprise)
+
+
+def assert_same_logs(logs, other_logs):
+    assert len(logs[0]) > 0
+    pd.testing.assert_frame_equal(logs[0], other_logs[0])
+    pd.testing.assert_frame_equal(logs[1], other_logs[1])
+
+
+@pytest.mark.parametrize("degradation_mode", ["expected", "stochastic"])
+def test_tick_and_event_engine_generate_identical_logs(degradation_mode):
+    params = config_params(DEGRADATION_MODE=degradation_mode)
+    assert_same_logs(simulate_params(params, "tick"), simulate_params(params, "event"))
+
+
+@pytest.mark.parametrize("mode,degradation_mode", [("tick", "sampled"), ("event", "expected"),
+                                                   ("event", "stochastic")])
+def test_resumed_run_generates_identical_logs(tmp_path, monkeypatch, mode, degradation_mode):
+    params = config_params(DEGRADATION_MODE=degradation_mode)
+    checkpoint_file = str(tmp_path / "checkpoint.pkl.gz")
+    uninterrupted_logs = simulate_params(params, mode)
+
+    # interrupt the run right after its second checkpoint
+    save_checkpoint = main.save_checkpoint
+    saved_checkpoints = []
+
+    def interrupting_save_checkpoint(sim_env, filename, checkpoint_mode):
+        save_checkpoint(sim_env, filename, checkpoint_mode)
+        saved_checkpoints.append(sim_env.timeManager.simTime)
+        if len(saved_checkpoints) == 2:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(main, "save_checkpoint", interrupting_save_checkpoint)
+    with pytest.raises(KeyboardInterrupt):
+        simulate_params(params, mode, checkpoint_file=checkpoint_file, checkpoint_interval=7000)
+    monkeypatch.setattr(main, "save_checkpoint", save_checkpoint)
+
+    # a new enterprise continues from the checkpoint
+    resumed_logs = simulate_params(params, mode, checkpoint_file=checkpoint_file, checkpoint_interval=7000)
+    assert_same_logs(uninterrupted_logs, resumed_logs)
+
+
+def test_json_and_npz_configs_generate_identical_logs(tmp_path):
+    json_params = config_params("20_stations_path_1.json")
+    configfile.save_config(configfile.load_config(os.path.join(CONFIG_DIR, "20_stations_path_1.json"), cache=False),
+                           str(tmp_path / "20_stations_path_1.npz"))
+    npz_params = config_params(str(tmp_path / "20_stations_path_1.npz"))
+
+    assert npz_params["STATION_PROBS"].contentHash == json_params["STATION_PROBS"].contentHash
+    assert_same_logs(simulate_params(json_params, "event"), simulate_params(npz_params, "event"))
@@ -0,0 +1,63 @@
+# This class holds the station transition probabilities in compressed sparse row (CSR) form
+# Generated transition matrices are mostly upper triangles or narrow corridors, so only the non-zero transitions
+# of every station are kept, i.e. their target stations and probabilities, with row pointers into both arrays
+# The content hash identifies the transitions independently of the file they were read from, so preprocessed
+# data like the alias tables of the route sampler can be cached between runs
+
+import hashlib
+
+import numpy as np
+
+
+class TransitionMatrix:
+
+    def __init__(self, matrix_name, row_pointers, targets, probabilities):
+
+        self.matrixName = matrix_name
+        self.rowPointers = np.asarray(row_pointers, dtype=np.int64)  # transitions of station i are in [p[i], p[i+1])
+        self.targets = np.asarray(targets, dtype=np.int32)  # target station of every transition
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.nStations = len(self.rowPointers) - 1
+        self.contentHash = self.hash()
+        self.aliasTables = None  # alias tables of the route sampler once they were built or read from a cache
+
+    @classmethod
+    def fromDense(cls, matrix_name, station_probs):
+        # compress a dense matrix, e.g. the nested lists of a json config
+        station_probs = np.asarray(station_probs, dtype=np.float64)
+        rows, targets = np.nonzero(station_probs)
+        row_pointers = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=station_probs.shape[0]))))
+        return cls(matrix_name, row_pointers, targets, station_probs[rows, targets])
+
+    def hash(self):
+        # sha256 of the transitions, equal for equal matrices regardless of their source
+        content = hashlib.sha256()
+        content.update(np.int64(self.nStations).tobytes())
+        content.update(self.rowPointers.tobytes())
+        content.update(self.targets.tobytes())
+        content.update(self.probabilities.tobytes())
+        return content.hexdigest()
+
+    def transitions(self, station):
+        # target stations and probabilities of the non-zero transitions of a station
+        row = slice(self.rowPointers[station], self.rowPointers[station + 1])
+        return self.targets[row], self.probabilities[row]
+
+    def row(self, station):
+        # dense row of a station as a list, like the rows of a json config
+        dense_row = np.zeros(self.nStations)
+        targets, probabilities = self.transitions(station)
+        dense_row[targets] = probabilities
+        return dense_row.tolist()
+
+    def toDense(self):
+        dense = np.zeros((self.nStations, self.nStations))
+        rows = np.repeat(np.arange(0, self.nStations), np.diff(self.rowPointers))
+        dense[rows, self.targets] = self.probabilities
+        return dense
+
+    def __len__(self):
+        return self.nStations
+
+    def __getitem__(self, station):
+        return self.row(station)